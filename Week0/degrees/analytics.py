@@ -0,0 +1,134 @@
+"""
+Degrees of separation statistics over a whole dataset, running one
+single-source search per person in a pool of worker processes.
+
+Usage: python analytics.py [directory] [sources] [processes]
+
+sources is either "all" for exact all-pairs statistics or a number
+of randomly sampled source people for an estimate (default 1000).
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import degrees
+
+DEFAULT_SAMPLES = 1000
+SEED = 50
+
+
+def loadWorker(directory):
+    """ Pool initializer for start methods that do not fork the loaded graph """
+    degrees.load_data(directory)
+    if degrees.graph is None:
+        degrees.useCompactGraph()
+
+
+def histogramFrom(source):
+    """
+    Returns (source, histogram) where histogram maps each distance
+    greater than zero to how many people are that far from source.
+    The search goes straight to the graph rather than through
+    degrees.distances_from, whose cache would only hold on to trees
+    no other source reuses.
+    """
+    histogram = degrees.graph.searchTree(source).histogram()
+    histogram.pop(0, None)
+    return source, histogram
+
+
+def separationStats(sources, processes=None, directory=None):
+    """
+    Runs a search from every source in a process pool and combines
+    the distances found into a statistics dictionary. Workers share the
+    already loaded data when processes are forked, and otherwise load
+    it from directory themselves.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = loadWorker, (directory,)
+
+    combined = {}
+    reachedTotal = 0
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(sources) // (processes * 8))
+    with context.Pool(processes, initializer, initargs) as pool:
+        for _, histogram in pool.imap_unordered(histogramFrom, sources, chunksize):
+            for distance, count in histogram.items():
+                combined[distance] = combined.get(distance, 0) + count
+                reachedTotal += count
+
+    possible = len(sources) * (len(degrees.people) - 1)
+    return summarize(combined, reachedTotal, possible)
+
+
+def summarize(histogram, pairs, possible):
+    """ Computes mean, median and max distance from a combined histogram """
+    if pairs == 0:
+        return {"pairs": 0, "unreachable": possible, "mean": None,
+                "median": None, "max": None, "histogram": {}}
+
+    histogram = dict(sorted(histogram.items()))
+    mean = sum(distance * count for distance, count in histogram.items()) / pairs
+    seen = 0
+    for distance, count in histogram.items():
+        seen += count
+        if seen * 2 >= pairs:
+            median = distance
+            break
+    return {
+        "pairs": pairs,
+        "unreachable": possible - pairs,
+        "mean": mean,
+        "median": median,
+        "max": max(histogram),
+        "histogram": histogram,
+    }
+
+
+def main():
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python analytics.py [directory] [sources] [processes]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    sampleArg = sys.argv[2] if len(sys.argv) > 2 else str(DEFAULT_SAMPLES)
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    # Forked workers share the graph's flat arrays copy-on-write, which
+    # unlike the dictionaries are not dirtied by reference counting
+    if degrees.graph is None:
+        degrees.useCompactGraph()
+    print("Data loaded.")
+
+    people = list(degrees.people)
+    if sampleArg == "all" or int(sampleArg) >= len(people):
+        sources = people
+        kind = "exact"
+    else:
+        sources = random.Random(SEED).sample(people, int(sampleArg))
+        kind = "estimated"
+
+    start = time.perf_counter()
+    stats = separationStats(sources, processes, directory)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(sources)} sources searched in {elapsed:.2f}s ({kind})")
+    print(f"Connected pairs: {stats['pairs']}, unreachable pairs: {stats['unreachable']}")
+    if stats["pairs"]:
+        print(f"Mean separation: {stats['mean']:.3f}")
+        print(f"Median separation: {stats['median']}")
+        label = "Diameter" if kind == "exact" else "Max separation seen (diameter lower bound)"
+        print(f"{label}: {stats['max']}")
+        for distance, count in stats["histogram"].items():
+            print(f"    {distance}: {count}")
+
+
+if __name__ == "__main__":
+    main()
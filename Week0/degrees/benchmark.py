@@ -0,0 +1,159 @@
+"""
+Benchmark runner for degrees load_data and shortest_path
+
+Usage: python benchmark.py [directory] [queries] [seconds]
+
+Times loading the data, then runs up to queries random source/target
+pairs (default 100) through every search type, giving each at most
+seconds of wall time (default 30), and reports nodes expanded, path
+reconstruction time, queries per second and peak memory.
+Generate test data with synthetic.py.
+"""
+
+import random
+import sys
+import time
+
+import degrees
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+DEFAULT_QUERIES = 100
+DEFAULT_SECONDS = 30
+SEED = 50
+SEARCH_TYPES = ["BreadthFirst", "DepthFirst", "Bidirectional"]
+
+
+def peakMemory():
+    """ Returns the peak resident memory of this process in MB, if known """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+class QueryTimeout(Exception):
+    """ Raised inside a search that has run past the benchmark's deadline """
+
+
+class Counters():
+    """
+    Wraps degrees functions to count expansions, time path
+    reconstruction and abandon searches that pass deadline.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.reconstruction = 0
+        self.deadline = None
+        self.neighbors = degrees.neighbors_for_person
+        self.solution = degrees.getSolutionPath
+
+    def install(self):
+        def neighbors_for_person(person_id):
+            self.expanded += 1
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise QueryTimeout()
+            return self.neighbors(person_id)
+
+        def getSolutionPath(endNode):
+            start = time.perf_counter()
+            path = self.solution(endNode)
+            self.reconstruction += time.perf_counter() - start
+            return path
+
+        degrees.neighbors_for_person = neighbors_for_person
+        degrees.getSolutionPath = getSolutionPath
+
+    def uninstall(self):
+        degrees.neighbors_for_person = self.neighbors
+        degrees.getSolutionPath = self.solution
+
+
+def runQueries(pairs, seconds, lastExpanded=None, counters=None):
+    """
+    Runs shortest_path over pairs until they are done or seconds have
+    passed. Returns (queries completed, their total seconds, people
+    they expanded), where expansions come from the installed counters
+    or are summed from lastExpanded() after each query. When counters
+    are installed, a query still running at the deadline is abandoned
+    and left out of the results.
+    """
+    start = time.perf_counter()
+    done = 0
+    elapsed = 0
+    expanded = 0
+    if counters is not None:
+        counters.deadline = start + seconds
+        counters.expanded = 0
+        counters.reconstruction = 0
+    for source, target in pairs:
+        try:
+            degrees.shortest_path(source, target)
+        except QueryTimeout:
+            break
+        done += 1
+        elapsed = time.perf_counter() - start
+        if counters is not None:
+            expanded = counters.expanded
+        elif lastExpanded is not None:
+            expanded += lastExpanded()
+        if elapsed > seconds:
+            break
+    return done, elapsed, expanded
+
+
+def report(label, done, elapsed, expanded, reconstruction=None):
+    """ Prints one result line """
+    if done == 0:
+        print(f"{label:<14} no query finished within the time limit")
+        return
+    line = (f"{label:<14} {done:>6} queries  {elapsed / done * 1000:>10.3f} ms/query  "
+            f"{done / elapsed:>9.1f} queries/s  {expanded / done:>10.1f} expanded/query")
+    if reconstruction is not None:
+        line += f"  {reconstruction / done * 1000:.4f} ms/path rebuilt"
+    print(line)
+
+
+def main():
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python benchmark.py [directory] [queries] [seconds]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_QUERIES
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_SECONDS
+
+    degrees.USE_SNAPSHOT = False
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    print(f"load_data (CSV): {time.perf_counter() - start:.3f}s, "
+          f"{len(degrees.people)} people, {len(degrees.movies)} movies")
+    print(f"Peak memory after load: {peakMemory() or 0:.1f} MB")
+
+    generator = random.Random(SEED)
+    people = list(degrees.people)
+    pairs = [(generator.choice(people), generator.choice(people)) for _ in range(queries)]
+
+    counters = Counters()
+    counters.install()
+    for searchType in SEARCH_TYPES:
+        degrees.SEARCH_TYPE = searchType
+        done, elapsed, expanded = runQueries(pairs, seconds, counters=counters)
+        report(searchType, done, elapsed, expanded,
+               counters.reconstruction if searchType != "Bidirectional" else None)
+    counters.uninstall()
+
+    degrees.SEARCH_TYPE = "BreadthFirst"
+    start = time.perf_counter()
+    degrees.useCompactGraph()
+    print(f"Compact graph built in {time.perf_counter() - start:.3f}s")
+    done, elapsed, expanded = runQueries(pairs, seconds, lambda: degrees.graph.lastExpanded)
+    report("Compact BFS", done, elapsed, expanded)
+    print(f"Peak memory: {peakMemory() or 0:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
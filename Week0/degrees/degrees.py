@@ -1,7 +1,14 @@
 import csv
+import os
 import sys
+from collections import OrderedDict
 
-from util import Node, StackFrontier, QueueFrontier
+import landmarks
+import loader
+import snapshot
+from nameindex import NameIndex
+from graph import StarGraph, PeopleView, MoviesView, NamesView
+from util import Node, SearchTree, IndexedStackFrontier, IndexedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,13 +19,82 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
-# Search type used to find the shortest path
+# Search type used to find the shortest path, one of
+# "BreadthFirst", "DepthFirst", "Bidirectional" or "Landmark"
 SEARCH_TYPE = "BreadthFirst"
 
+# Whether load_data should convert people and movies into a compact
+# integer indexed StarGraph, searched directly by breadth first search
+COMPACT_GRAPH = False
 
-def load_data(directory):
+# Whether load_data should load a snapshot written by snapshot.py
+# instead of the CSV files when it is newer than them
+USE_SNAPSHOT = True
+
+# Compact StarGraph of the loaded data, if one has been built
+graph = None
+
+# LandmarkIndex over graph, loaded when SEARCH_TYPE is "Landmark"
+landmarkIndex = None
+
+# NameIndex over people, built on first non-interactive name lookup
+nameIndex = None
+
+# Maps each CSV file name to the byte offset it has been read up to,
+# where refresh_data picks up rows appended since
+loadedOffsets = {}
+
+# loader.LoadFilter the data was loaded with, applied to appended rows too
+activeFilter = None
+
+# Most recently used search trees from distances_from, keyed by
+# (source, maxDepth), and how many of them to keep
+searchCache = OrderedDict()
+SEARCH_CACHE_SIZE = 8
+
+
+def load_data(directory, loadFilter=None):
     """
     Load data from CSV files into memory.
+
+    When a loader.LoadFilter is given, the CSV files are streamed and
+    only the part of the graph it selects is built, and the loader's
+    report of what was kept and skipped is returned.
+    """
+    global activeFilter, names, people, movies, graph, landmarkIndex, nameIndex
+
+    # Start from scratch, since a snapshot or compact graph leaves read
+    # only views in place of the dictionaries
+    names = {}
+    people = {}
+    movies = {}
+    graph = None
+    landmarkIndex = None
+    nameIndex = None
+    loadedOffsets.clear()
+    searchCache.clear()
+
+    report = None
+    activeFilter = loadFilter
+    if loadFilter is None and USE_SNAPSHOT and snapshot.isFresh(directory):
+        useSnapshot(directory)
+    else:
+        if loadFilter is None:
+            loadCsvData(directory)
+        else:
+            report = loader.streamData(directory, loadFilter, names, people, movies,
+                                       loadedOffsets)
+        if COMPACT_GRAPH:
+            useCompactGraph()
+
+    if SEARCH_TYPE == "Landmark":
+        useLandmarks(directory)
+    return report
+
+
+def loadCsvData(directory):
+    """
+    Parses the CSV files into the names, people and movies dictionaries.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -33,6 +109,7 @@ def load_data(directory):
                 names[row["name"].lower()] = {row["id"]}
             else:
                 names[row["name"].lower()].add(row["id"])
+        loadedOffsets["people.csv"] = f.tell()
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
@@ -43,6 +120,7 @@ def load_data(directory):
                 "year": row["year"],
                 "stars": set(),
             }
+        loadedOffsets["movies.csv"] = f.tell()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
@@ -53,6 +131,176 @@ def load_data(directory):
                 movies[row["movie_id"]]["stars"].add(row["person_id"])
             except KeyError:
                 pass
+        loadedOffsets["stars.csv"] = f.tell()
+
+
+def useCompactGraph():
+    """
+    Replaces the people and movies dictionaries with read only views of
+    a compact StarGraph built from them, freeing the dictionaries.
+    """
+    global graph, people, movies
+    graph = StarGraph.fromData(people, movies)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+
+
+def useSnapshot(directory):
+    """
+    Memory maps the directory's snapshot and replaces names, people
+    and movies with read only views of its StarGraph.
+    """
+    global graph, names, people, movies
+    graph, sourceSizes = snapshot.readSnapshot(snapshot.snapshotPath(directory))
+    loadedOffsets.update(sourceSizes)
+    names = NamesView(graph)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+
+
+def useLandmarks(directory):
+    """
+    Loads the directory's landmark index written by landmarks.py,
+    building one in memory if it is missing or out of date.
+    """
+    global landmarkIndex
+    if graph is None:
+        useCompactGraph()
+    path = landmarks.indexPath(directory)
+    try:
+        landmarkIndex = landmarks.LandmarkIndex.load(path, graph)
+    except (FileNotFoundError, landmarks.StaleIndexError):
+        landmarkIndex = landmarks.LandmarkIndex.build(graph)
+
+
+def refresh_data(directory):
+    """
+    Picks up the rows appended to the CSV files in directory since
+    they were loaded, without reloading them. The directory's snapshot
+    and landmark index are rewritten to match, if they exist. Loads
+    filtered on minMovies are refused, as in apply_updates.
+
+    Returns the list of (person_id, movie_id) credits that were added.
+    """
+    rows, offsets = loader.readAppended(directory, loadedOffsets)
+    added = apply_updates(rows["people.csv"], rows["movies.csv"], rows["stars.csv"])
+    loadedOffsets.update(offsets)
+
+    snapshotPath = snapshot.snapshotPath(directory)
+    indexPath = landmarks.indexPath(directory)
+    saveIndex = landmarkIndex is not None and os.path.exists(indexPath)
+    if activeFilter is None and (os.path.exists(snapshotPath) or saveIndex):
+        compact = graph.compacted() if graph is not None else StarGraph.fromData(people, movies)
+        if os.path.exists(snapshotPath):
+            snapshot.writeSnapshot(snapshotPath, compact, loadedOffsets)
+        if saveIndex:
+            landmarkIndex.rebased(compact).save(indexPath)
+    return added
+
+
+def apply_updates(newPeople=(), newMovies=(), newCredits=()):
+    """
+    Adds people, movies and star credits to the loaded data in place.
+    Each is an iterable of rows shaped like the CSV files' rows:
+    people have "id", "name" and "birth", movies "id", "title" and
+    "year", and credits "person_id" and "movie_id". Rows for ids that
+    are already loaded or that the load filter leaves out are skipped,
+    as are credits for unknown people or movies.
+
+    Loads filtered on minMovies are refused with an Exception: whether a
+    left out person now has enough credits depends on credits that were
+    never kept, so only a full load_data can apply that rule.
+
+    The landmark index is updated if one is loaded, and cached search
+    trees the new credits could change are dropped. Returns the list
+    of (person_id, movie_id) credits that were added.
+    """
+    if activeFilter is not None and activeFilter.minMovies is not None:
+        raise Exception("cannot apply updates to data filtered on minMovies, reload it instead")
+
+    for row in newPeople:
+        if activeFilter is not None and not activeFilter.keepsPerson(row["id"]):
+            continue
+        if graph is not None:
+            if graph.addPerson(row["id"], row["name"], row["birth"]) is None:
+                continue
+        elif row["id"] in people:
+            continue
+        else:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set(),
+            }
+        if isinstance(names, dict):
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+        if nameIndex is not None:
+            nameIndex.add(row["name"], row["id"])
+
+    for row in newMovies:
+        if activeFilter is not None and not activeFilter.keepsMovie(row["year"]):
+            continue
+        if graph is not None:
+            graph.addMovie(row["id"], row["title"], row["year"])
+        elif row["id"] not in movies:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set(),
+            }
+
+    added = []
+    indexCredits = []  # The same credits as (person, movie) graph indices
+    for row in newCredits:
+        personId = row["person_id"]
+        movieId = row["movie_id"]
+        if graph is not None:
+            credit = graph.addCredit(personId, movieId)
+            if credit is None:
+                continue
+            indexCredits.append(credit)
+        elif personId in people and movieId in movies:
+            if movieId in people[personId]["movies"]:
+                continue
+            people[personId]["movies"].add(movieId)
+            movies[movieId]["stars"].add(personId)
+        else:
+            continue
+        added.append((personId, movieId))
+
+    if landmarkIndex is not None:
+        landmarkIndex.update(indexCredits)
+    invalidateSearches(added)
+    return added
+
+
+def invalidateSearches(credits):
+    """
+    Drops the cached search trees that the new (person_id, movie_id)
+    credits could change. A tree is unaffected unless some credit
+    links a person it reached, short of its depth limit, to a costar it
+    did not reach or reached more than one degree further away.
+    """
+    for key in list(searchCache):
+        tree = searchCache[key]
+        maxDepth = key[1]
+        for personId, movieId in credits:
+            if any(shortensSearch(tree, maxDepth, personId, costarId)
+                   for costarId in movies[movieId]["stars"]):
+                del searchCache[key]
+                break
+
+
+def shortensSearch(tree, maxDepth, personId, costarId):
+    """ Returns True if a new link between two people changes a search tree """
+    for near, far in ((personId, costarId), (costarId, personId)):
+        nearDistance = tree.distance(near)
+        if nearDistance is None or (maxDepth is not None and nearDistance >= maxDepth):
+            continue
+        farDistance = tree.distance(far)
+        if farDistance is None or farDistance > nearDistance + 1:
+            return True
+    return False
 
 
 def main():
@@ -95,12 +343,23 @@ def shortest_path(source, target):
     If no possible path, returns None.
     """
 
+    if SEARCH_TYPE == "Landmark":
+        return getLandmarkIndex().shortestPath(source, target)
+    if graph is not None and SEARCH_TYPE == "BreadthFirst":
+        return graph.shortestPath(source, target)
+    if SEARCH_TYPE == "Bidirectional":
+        return bidirectionalSearch(source, target)
+
+    # A person is zero degrees from themselves, as in every other mode
+    if source == target:
+        return []
+
     # Initialize an empy frontier of the type specified at the top
     # of the module
     if SEARCH_TYPE == "DepthFirst":
-        frontier = StackFrontier()
+        frontier = IndexedStackFrontier()
     elif SEARCH_TYPE == "BreadthFirst":
-        frontier = QueueFrontier()
+        frontier = IndexedQueueFrontier()
     else:
         raise Exception("Illegal search type")
 
@@ -126,6 +385,153 @@ def shortest_path(source, target):
                 neighborNode = Node(neighbor, currentNode, None)  # TODO what is an action
                 frontier.add(neighborNode)
     return None # No solution found
+
+
+def bidirectionalSearch(source, target):
+    """
+    Breadth first search grown from both the source and the target,
+    expanding whichever side has the smaller frontier one full layer
+    at a time until the two searches meet.
+
+    Returns the same (movie_id, person_id) path as shortest_path,
+    or None if there is no path.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) they were
+    # reached from, and to their distance from that side's start
+    sourceParents = {source: None}
+    targetParents = {target: None}
+    sourceDistances = {source: 0}
+    targetDistances = {target: 0}
+    sourceLayer = [source]
+    targetLayer = [target]
+
+    while sourceLayer and targetLayer:
+        if len(sourceLayer) <= len(targetLayer):
+            sourceLayer, meeting = expandLayer(
+                sourceLayer, sourceParents, sourceDistances, targetDistances)
+        else:
+            targetLayer, meeting = expandLayer(
+                targetLayer, targetParents, targetDistances, sourceDistances)
+        if meeting is not None:
+            return joinPaths(meeting, sourceParents, targetParents)
+    return None # The two searches never met
+
+
+def expandLayer(layer, parents, distances, otherDistances):
+    """
+    Expands every person in layer by one step, recording parents and
+    distances for newly reached people. Returns the next layer and the
+    person where this side met the other search on the shortest joined
+    path, or None if the searches have not met yet.
+    """
+    nextLayer = []
+    meeting = None
+    bestLength = None
+    for personId in layer:
+        for movieId, neighborId in neighbors_for_person(personId):
+            if neighborId in distances:
+                continue
+            parents[neighborId] = (movieId, personId)
+            distances[neighborId] = distances[personId] + 1
+            nextLayer.append(neighborId)
+            if neighborId in otherDistances:
+                length = distances[neighborId] + otherDistances[neighborId]
+                if bestLength is None or length < bestLength:
+                    bestLength = length
+                    meeting = neighborId
+    return nextLayer, meeting
+
+
+def joinPaths(meeting, sourceParents, targetParents):
+    """
+    Joins the source side and target side parent chains at the meeting
+    person into a single source to target path.
+    """
+    path = []
+    personId = meeting
+    while sourceParents[personId] is not None:
+        movieId, previousId = sourceParents[personId]
+        path.insert(0, (movieId, personId))
+        personId = previousId
+
+    personId = meeting
+    while targetParents[personId] is not None:
+        movieId, nextId = targetParents[personId]
+        path.append((movieId, nextId))
+        personId = nextId
+    return path
+
+
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each person id in targets to the
+    shortest list of (movie_id, person_id) pairs connecting source to
+    it, or None if they are not connected. All targets are answered
+    by a single breadth first search from source.
+    """
+    if graph is not None:
+        return graph.shortestPaths(source, targets)
+
+    tree = searchFrom(source, targets)
+    return {target: tree.pathTo(target) for target in targets}
+
+
+def distances_from(source, maxDepth=None):
+    """
+    Runs one breadth first search from source over the whole graph (or
+    out to maxDepth degrees) and returns a search tree holding the
+    distance and parent of every person reached, from which any of
+    their paths can be rebuilt. Recent trees are cached until new
+    credits change them.
+    """
+    key = (source, maxDepth)
+    if key in searchCache:
+        searchCache.move_to_end(key)
+        return searchCache[key]
+
+    if graph is not None:
+        tree = graph.searchTree(source, maxDepth)
+    else:
+        tree = searchFrom(source, maxDepth=maxDepth)
+    searchCache[key] = tree
+    if len(searchCache) > SEARCH_CACHE_SIZE:
+        searchCache.popitem(last=False)
+    return tree
+
+
+def searchFrom(source, targets=None, maxDepth=None):
+    """
+    Breadth first search from source, stopping early once every
+    person in targets has been reached or after maxDepth degrees.
+    Returns the resulting SearchTree.
+    """
+    distances = {source: 0}
+    parents = {source: None}  # Maps reached people to (movie_id, person_id) they came from
+    remaining = None
+    if targets is not None:
+        # Unknown people can never be reached, so are not waited for
+        remaining = {target for target in targets if target in people} - {source}
+
+    layer = [source]
+    depth = 0
+    while layer and remaining != set() and (maxDepth is None or depth < maxDepth):
+        depth += 1
+        nextLayer = []
+        for personId in layer:
+            for movieId, neighborId in neighbors_for_person(personId):
+                if neighborId in distances:
+                    continue
+                distances[neighborId] = depth
+                parents[neighborId] = (movieId, personId)
+                nextLayer.append(neighborId)
+                if remaining is not None:
+                    remaining.discard(neighborId)
+        layer = nextLayer
+    return SearchTree(source, distances, parents)
+
  
 def getSolutionPath(endNode):
     """ Returns a list of all the previous states to get to the end node """
@@ -137,11 +543,18 @@ def getSolutionPath(endNode):
         currNode = currNode.parent
     return solutionPath
 
-def person_id_for_name(name):
+def person_id_for_name(name, interactive=True, birth=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    When interactive is False, ambiguous and misspelled names are
+    resolved by the NameIndex policy instead of prompting, using
+    birth as a hint when given.
     """
+    if not interactive:
+        return getNameIndex().resolve(name, people, birth)
+
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
@@ -163,6 +576,29 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def getNameIndex():
+    """ Returns the NameIndex over people, building it on first use """
+    global nameIndex
+    if nameIndex is None and graph is not None:
+        nameIndex = NameIndex.fromGraph(graph)
+    elif nameIndex is None:
+        nameIndex = NameIndex.fromPeople(people)
+    return nameIndex
+
+
+def getLandmarkIndex():
+    """
+    Returns the LandmarkIndex over graph, building one in memory on
+    first use when SEARCH_TYPE was set to "Landmark" after loading.
+    """
+    global landmarkIndex
+    if landmarkIndex is None:
+        if graph is None:
+            useCompactGraph()
+        landmarkIndex = landmarks.LandmarkIndex.build(graph)
+    return landmarkIndex
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
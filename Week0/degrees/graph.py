@@ -0,0 +1,499 @@
+"""
+Compact integer indexed star graph for degrees
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+
+
+class StarGraph():
+    """
+    Bipartite people/movies star graph stored as compressed sparse row
+    arrays. People and movies are interned to dense ints by their
+    position in the sorted personIds and movieIds sequences, so
+    personMovies[personOffsets[i]:personOffsets[i + 1]] are the movies
+    person i starred in and movieStars[movieOffsets[j]:movieOffsets[j + 1]]
+    are the people who starred in movie j.
+
+    nameOrder, when present, lists person indices sorted by lowercase
+    name and backs NamesView lookups.
+
+    People, movies and credits added after the graph was built are kept
+    in an overlay: new ids are appended past the sorted ones and found
+    through addedPeople/addedMovies, and new credits are listed in
+    addedPersonMovies/addedMovieStars next to the CSR arrays.
+    """
+
+    def __init__(self, personIds, movieIds, personOffsets, personMovies,
+                 movieOffsets, movieStars, personNames, personBirths,
+                 movieTitles, movieYears, nameOrder=None):
+        self.personIds = personIds
+        self.movieIds = movieIds
+        self.personOffsets = personOffsets
+        self.personMovies = personMovies
+        self.movieOffsets = movieOffsets
+        self.movieStars = movieStars
+        self.personNames = personNames
+        self.personBirths = personBirths
+        self.movieTitles = movieTitles
+        self.movieYears = movieYears
+        self.nameOrder = nameOrder
+        self.lastExpanded = 0  # People expanded by the last search
+
+        self.sortedPeople = len(personIds)
+        self.sortedMovies = len(movieIds)
+        self.addedPeople = {}  # Maps added person ids to their index
+        self.addedMovies = {}  # Maps added movie ids to their index
+        self.addedPersonMovies = {}  # Maps person indices to movie indices credited later
+        self.addedMovieStars = {}  # Maps movie indices to person indices credited later
+        self.addedCredits = 0
+
+    @classmethod
+    def fromData(cls, people, movies):
+        """
+        Builds a graph from the people and movies dictionaries
+        filled in by degrees.load_data.
+        """
+        personIds = sorted(people)
+        movieIds = sorted(movies)
+        personIndex = {personId: i for i, personId in enumerate(personIds)}
+        movieIndex = {movieId: i for i, movieId in enumerate(movieIds)}
+
+        personOffsets = array("i", [0])
+        personMovies = array("i")
+        for personId in personIds:
+            personMovies.extend(sorted(
+                movieIndex[movieId] for movieId in people[personId]["movies"]))
+            personOffsets.append(len(personMovies))
+
+        movieOffsets = array("i", [0])
+        movieStars = array("i")
+        for movieId in movieIds:
+            movieStars.extend(sorted(
+                personIndex[personId] for personId in movies[movieId]["stars"]))
+            movieOffsets.append(len(movieStars))
+
+        return cls(
+            personIds, movieIds, personOffsets, personMovies,
+            movieOffsets, movieStars,
+            [people[personId]["name"] for personId in personIds],
+            [people[personId]["birth"] for personId in personIds],
+            [movies[movieId]["title"] for movieId in movieIds],
+            [movies[movieId]["year"] for movieId in movieIds],
+        )
+
+    def buildNameOrder(self):
+        """ Returns person indices sorted by lowercase name """
+        return array("i", sorted(range(len(self.personIds)),
+                                 key=lambda person: self.personNames[person].lower()))
+
+    def personIndex(self, personId):
+        """ Returns the dense index of an IMDB person id, or None """
+        person = findIndex(self.personIds, personId, self.sortedPeople)
+        if person is None:
+            return self.addedPeople.get(personId)
+        return person
+
+    def movieIndex(self, movieId):
+        """ Returns the dense index of an IMDB movie id, or None """
+        movie = findIndex(self.movieIds, movieId, self.sortedMovies)
+        if movie is None:
+            return self.addedMovies.get(movieId)
+        return movie
+
+    def moviesOf(self, person):
+        """ Returns the movie indices a person index starred in """
+        movies = self.personMovies[self.personOffsets[person]:self.personOffsets[person + 1]]
+        if person in self.addedPersonMovies:
+            return list(movies) + self.addedPersonMovies[person]
+        return movies
+
+    def starsOf(self, movie):
+        """ Returns the person indices that starred in a movie index """
+        stars = self.movieStars[self.movieOffsets[movie]:self.movieOffsets[movie + 1]]
+        if movie in self.addedMovieStars:
+            return list(stars) + self.addedMovieStars[movie]
+        return stars
+
+    def creditCount(self):
+        """ Returns the number of star credits in the graph """
+        return len(self.personMovies) + self.addedCredits
+
+    def makeGrowable(self):
+        """
+        Converts the graph's sequences into ones that can be appended
+        to, copying memory mapped offsets and wrapping string tables.
+        """
+        for name in ("personOffsets", "movieOffsets", "nameOrder"):
+            values = getattr(self, name)
+            if values is not None and not isinstance(values, array):
+                copy = array("i")
+                copy.frombytes(values.tobytes())
+                setattr(self, name, copy)
+        for name in ("personIds", "movieIds", "personNames", "personBirths",
+                     "movieTitles", "movieYears"):
+            values = getattr(self, name)
+            if not hasattr(values, "append"):
+                setattr(self, name, GrowableSequence(values))
+
+    def addPerson(self, personId, name, birth):
+        """ Adds a person with no credits, returning their index or None if known """
+        if self.personIndex(personId) is not None:
+            return None
+        self.makeGrowable()
+        person = len(self.personIds)
+        self.personIds.append(personId)
+        self.personNames.append(name)
+        self.personBirths.append(birth)
+        self.personOffsets.append(self.personOffsets[-1])
+        self.addedPeople[personId] = person
+        if self.nameOrder is not None:
+            position = bisect_right(SortedNames(self), name.lower())
+            self.nameOrder.insert(position, person)
+        return person
+
+    def addMovie(self, movieId, title, year):
+        """ Adds a movie with no stars, returning its index or None if known """
+        if self.movieIndex(movieId) is not None:
+            return None
+        self.makeGrowable()
+        movie = len(self.movieIds)
+        self.movieIds.append(movieId)
+        self.movieTitles.append(title)
+        self.movieYears.append(year)
+        self.movieOffsets.append(self.movieOffsets[-1])
+        self.addedMovies[movieId] = movie
+        return movie
+
+    def addCredit(self, personId, movieId):
+        """
+        Credits a person with starring in a movie. Returns the (person,
+        movie) indices, or None if either id is unknown or the credit
+        already exists.
+        """
+        person = self.personIndex(personId)
+        movie = self.movieIndex(movieId)
+        if person is None or movie is None or movie in self.moviesOf(person):
+            return None
+        self.addedPersonMovies.setdefault(person, []).append(movie)
+        self.addedMovieStars.setdefault(movie, []).append(person)
+        self.addedCredits += 1
+        return person, movie
+
+    def compacted(self):
+        """ Returns a new graph with every added person, movie and credit merged in """
+        return StarGraph.fromData(PeopleView(self), MoviesView(self))
+
+    def search(self, source, targets=None, maxDepth=None):
+        """
+        Breadth first search over person indices starting at source.
+        Stops as soon as every person index in targets is reached when
+        targets are given, or after maxDepth degrees.
+
+        Returns (distances, parentPeople, parentMovies) arrays indexed by
+        person, with -1 marking people that were not reached.
+        """
+        personOffsets = self.personOffsets
+        personMovies = self.personMovies
+        movieOffsets = self.movieOffsets
+        movieStars = self.movieStars
+        addedPersonMovies = self.addedPersonMovies
+        addedMovieStars = self.addedMovieStars
+
+        distances = array("i", [-1]) * len(self.personIds)
+        parentPeople = array("i", [-1]) * len(self.personIds)
+        parentMovies = array("i", [-1]) * len(self.personIds)
+        exploredMovies = bytearray(len(self.movieIds))
+        remaining = set(targets) if targets is not None else None
+
+        distances[source] = 0
+        if remaining is not None and not remaining:
+            self.lastExpanded = 0
+            return distances, parentPeople, parentMovies
+        layer = [source]
+        depth = 0
+        expanded = 0
+        while layer and (maxDepth is None or depth < maxDepth):
+            depth += 1
+            nextLayer = []
+            for person in layer:
+                expanded += 1
+                movieList, first, last = personMovies, personOffsets[person], personOffsets[person + 1]
+                if addedPersonMovies and person in addedPersonMovies:
+                    movieList = self.moviesOf(person)
+                    first, last = 0, len(movieList)
+                for i in range(first, last):
+                    movie = movieList[i]
+                    # Every costar of an explored movie was already reached
+                    if exploredMovies[movie]:
+                        continue
+                    exploredMovies[movie] = 1
+                    starList, start, end = movieStars, movieOffsets[movie], movieOffsets[movie + 1]
+                    if addedMovieStars and movie in addedMovieStars:
+                        starList = self.starsOf(movie)
+                        start, end = 0, len(starList)
+                    for j in range(start, end):
+                        costar = starList[j]
+                        if distances[costar] != -1:
+                            continue
+                        distances[costar] = depth
+                        parentPeople[costar] = person
+                        parentMovies[costar] = movie
+                        if remaining is not None and costar in remaining:
+                            remaining.discard(costar)
+                            if not remaining:
+                                self.lastExpanded = expanded
+                                return distances, parentPeople, parentMovies
+                        nextLayer.append(costar)
+            layer = nextLayer
+        self.lastExpanded = expanded
+        return distances, parentPeople, parentMovies
+
+    def pathTo(self, target, parentPeople, parentMovies):
+        """
+        Rebuilds the (movie_id, person_id) path to a target index from
+        the parent arrays returned by search.
+        """
+        path = []
+        person = target
+        while parentPeople[person] != -1:
+            path.append((self.movieIds[parentMovies[person]], self.personIds[person]))
+            person = parentPeople[person]
+        path.reverse()
+        return path
+
+    def shortestPath(self, sourceId, targetId):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect two IMDB person ids, or None if they are not connected.
+        """
+        source = self.personIndex(sourceId)
+        target = self.personIndex(targetId)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+
+        distances, parentPeople, parentMovies = self.search(source, [target])
+        if distances[target] == -1:
+            return None
+        return self.pathTo(target, parentPeople, parentMovies)
+
+    def shortestPaths(self, sourceId, targetIds):
+        """
+        Returns a dictionary mapping each of targetIds to its shortest
+        path from sourceId (or None), all answered by one search.
+        """
+        source = self.personIndex(sourceId)
+        targets = {targetId: self.personIndex(targetId) for targetId in targetIds}
+        paths = {targetId: None for targetId in targetIds}
+        if source is None:
+            return paths
+
+        wanted = [target for target in targets.values()
+                  if target is not None and target != source]
+        if not wanted:
+            for targetId, target in targets.items():
+                if target == source:
+                    paths[targetId] = []
+            return paths
+        distances, parentPeople, parentMovies = self.search(source, wanted)
+        for targetId, target in targets.items():
+            if target == source:
+                paths[targetId] = []
+            elif target is not None and distances[target] != -1:
+                paths[targetId] = self.pathTo(target, parentPeople, parentMovies)
+        return paths
+
+    def searchTree(self, sourceId, maxDepth=None):
+        """
+        Searches the whole graph (or out to maxDepth degrees) from an IMDB
+        person id and returns the resulting CompactSearchTree.
+        """
+        source = self.personIndex(sourceId)
+        if source is None:
+            raise KeyError(sourceId)
+        return CompactSearchTree(self, source, *self.search(source, maxDepth=maxDepth))
+
+
+class CompactSearchTree():
+    """
+    StarGraph counterpart of util.SearchTree, answering the same queries
+    from the distance and parent arrays of one search.
+    """
+
+    def __init__(self, graph, source, distances, parentPeople, parentMovies):
+        self.graph = graph
+        self.source = graph.personIds[source]
+        self.distances = distances
+        self.parentPeople = parentPeople
+        self.parentMovies = parentMovies
+
+    def __len__(self):
+        return len(self.distances) - self.distances.count(-1)
+
+    def distance(self, personId):
+        """ Returns the degrees of separation to personId, or None if not reached """
+        person = self.graph.personIndex(personId)
+        if person is None or person >= len(self.distances) or self.distances[person] == -1:
+            return None
+        return self.distances[person]
+
+    def within(self, degrees):
+        """ Returns the set of people at most degrees away from the source """
+        return {self.graph.personIds[person]
+                for person, distance in enumerate(self.distances)
+                if 0 <= distance <= degrees}
+
+    def histogram(self):
+        """ Returns a dictionary mapping each distance to how many people are that far away """
+        counts = {}
+        for distance in self.distances:
+            if distance != -1:
+                counts[distance] = counts.get(distance, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def pathTo(self, targetId):
+        """
+        Returns the list of (movie_id, person_id) pairs leading from the
+        source to targetId, or None if it was not reached.
+        """
+        target = self.graph.personIndex(targetId)
+        if target is None or target >= len(self.distances) or self.distances[target] == -1:
+            return None
+        return self.graph.pathTo(target, self.parentPeople, self.parentMovies)
+
+
+class PeopleView(Mapping):
+    """
+    Read only stand-in for the degrees people dictionary, building each
+    person's dictionary from a StarGraph on access.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, personId):
+        person = self.graph.personIndex(personId)
+        if person is None:
+            raise KeyError(personId)
+        return {
+            "name": self.graph.personNames[person],
+            "birth": self.graph.personBirths[person],
+            "movies": {self.graph.movieIds[movie] for movie in self.graph.moviesOf(person)},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.personIds)
+
+    def __len__(self):
+        return len(self.graph.personIds)
+
+
+class MoviesView(Mapping):
+    """
+    Read only stand-in for the degrees movies dictionary, building each
+    movie's dictionary from a StarGraph on access.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movieId):
+        movie = self.graph.movieIndex(movieId)
+        if movie is None:
+            raise KeyError(movieId)
+        return {
+            "title": self.graph.movieTitles[movie],
+            "year": self.graph.movieYears[movie],
+            "stars": {self.graph.personIds[person] for person in self.graph.starsOf(movie)},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movieIds)
+
+    def __len__(self):
+        return len(self.graph.movieIds)
+
+
+class NamesView(Mapping):
+    """
+    Read only stand-in for the degrees names dictionary, mapping
+    lowercase names to sets of person ids by binary searching the
+    graph's nameOrder.
+    """
+
+    def __init__(self, graph):
+        if graph.nameOrder is None:
+            graph.nameOrder = graph.buildNameOrder()
+        self.graph = graph
+        self.keys = SortedNames(graph)
+
+    def __getitem__(self, name):
+        start = bisect_left(self.keys, name)
+        personIds = set()
+        for i in range(start, len(self.keys)):
+            if self.keys[i] != name:
+                break
+            personIds.add(self.graph.personIds[self.graph.nameOrder[i]])
+        if not personIds:
+            raise KeyError(name)
+        return personIds
+
+    def __iter__(self):
+        previous = None
+        for i in range(len(self.keys)):
+            name = self.keys[i]
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class SortedNames():
+    """ Lowercase names of a graph's people, in nameOrder """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, i):
+        return self.graph.personNames[self.graph.nameOrder[i]].lower()
+
+    def __len__(self):
+        return len(self.graph.nameOrder)
+
+
+class GrowableSequence(Sequence):
+    """ Read only sequence, such as a snapshot StringTable, with items appended after it """
+
+    def __init__(self, base):
+        self.base = base
+        self.added = []
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < len(self.base):
+            return self.base[i]
+        return self.added[i - len(self.base)]
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def append(self, value):
+        self.added.append(value)
+
+
+def findIndex(sortedIds, key, count=None):
+    """
+    Binary searches the first count (by default all) ids of a sorted
+    id sequence, returning the position of key or None.
+    """
+    count = len(sortedIds) if count is None else count
+    i = bisect_left(sortedIds, key, 0, count)
+    if i < count and sortedIds[i] == key:
+        return i
+    return None
@@ -0,0 +1,355 @@
+"""
+Landmark distance index for degrees, giving instant separation bounds
+and a breadth first search pruned by the landmark triangle inequality.
+
+Usage: python landmarks.py build [directory] [landmarks]
+       python landmarks.py bench [directory] [queries]
+"""
+
+import os
+import random
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+
+INDEX_NAME = "degrees.landmarks"
+MAGIC = b"DEGLMK02"
+OLD_MAGICS = (b"DEGLMK01",)
+HEADER_SIZE = len(MAGIC) + 24
+DEFAULT_LANDMARKS = 16
+
+# Landmarks pruning each search, those with the best bound for its pair
+ACTIVE_LANDMARKS = 4
+DEFAULT_QUERIES = 200
+SEED = 50
+
+
+class StaleIndexError(Exception):
+    """ Raised when a landmark index was written for another graph or version """
+
+
+def graphChecksum(graph):
+    """
+    Returns a CRC32 of a StarGraph's person ids and credits, which
+    changes when any credit is rewired even if the counts stay the same.
+    """
+    checksum = zlib.crc32("\n".join(graph.personIds).encode())
+    for values in (graph.personOffsets, graph.personMovies, graph.movieOffsets, graph.movieStars):
+        checksum = zlib.crc32(values, checksum)
+    for added in (graph.addedPersonMovies, graph.addedMovieStars):
+        checksum = zlib.crc32(repr(sorted(added.items())).encode(), checksum)
+    return checksum
+
+
+class LandmarkIndex():
+    """
+    Breadth first search distances from a few well connected landmark
+    people to everyone in a StarGraph. For any landmark L and people
+    s and t, |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks  # Person indices of the landmarks
+        self.distances = distances  # One int16 array per landmark, -1 if unreachable
+        self.lastExpanded = 0  # People expanded by the last shortestPath call
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS):
+        """
+        Picks the count people with the most costar slots (the summed
+        cast sizes of their movies) and searches from each of them.
+        """
+        def costarSlots(person):
+            return sum(len(graph.starsOf(movie)) for movie in graph.moviesOf(person))
+
+        landmarks = sorted(range(len(graph.personIds)), key=costarSlots, reverse=True)[:count]
+        distances = [array("h", graph.search(landmark)[0]) for landmark in landmarks]
+        return cls(graph, landmarks, distances)
+
+    def save(self, path):
+        """ Writes the landmark distances to path """
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(self.landmarks).to_bytes(4, "little"))
+            f.write(len(self.graph.personIds).to_bytes(8, "little"))
+            f.write(self.graph.creditCount().to_bytes(8, "little"))
+            f.write(graphChecksum(self.graph).to_bytes(4, "little"))
+            array("i", self.landmarks).tofile(f)
+            for distances in self.distances:
+                distances.tofile(f)
+
+    @classmethod
+    def load(cls, path, graph):
+        """
+        Reads landmark distances written by save for the same graph.
+        Raises StaleIndexError if the graph has changed since or the
+        index is from an older version, and an Exception if it is not a
+        landmark index or is truncated.
+        """
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            magic = header[:len(MAGIC)]
+            if magic in OLD_MAGICS:
+                raise StaleIndexError(f"{path} was written by an older version")
+            if magic != MAGIC:
+                raise Exception(f"{path} is not a degrees landmark index")
+            if len(header) != HEADER_SIZE:
+                raise Exception(f"{path} is truncated")
+            count = int.from_bytes(header[8:12], "little")
+            people = int.from_bytes(header[12:20], "little")
+            credits = int.from_bytes(header[20:28], "little")
+            checksum = int.from_bytes(header[28:32], "little")
+            if (people != len(graph.personIds) or credits != graph.creditCount()
+                    or checksum != graphChecksum(graph)):
+                raise StaleIndexError(f"{path} was built for a different graph")
+            try:
+                landmarks = array("i")
+                landmarks.fromfile(f, count)
+                distances = []
+                for _ in range(count):
+                    landmarkDistances = array("h")
+                    landmarkDistances.fromfile(f, people)
+                    distances.append(landmarkDistances)
+            except EOFError:
+                raise Exception(f"{path} is truncated")
+        return cls(graph, list(landmarks), distances)
+
+    def update(self, credits):
+        """
+        Brings the distances up to date after people and the given
+        (person, movie) index credits were added to the graph. New
+        people start unreachable, and distances that a new credit
+        shortens are lowered and propagated outwards.
+        """
+        for distances in self.distances:
+            distances.extend([-1] * (len(self.graph.personIds) - len(distances)))
+
+            changed = deque()
+            for person, movie in credits:
+                for costar in self.graph.starsOf(movie):
+                    for near, far in ((person, costar), (costar, person)):
+                        if distances[near] != -1 and (
+                            distances[far] == -1 or distances[near] + 1 < distances[far]
+                        ):
+                            distances[far] = distances[near] + 1
+                            changed.append(far)
+
+            while changed:
+                person = changed.popleft()
+                for movie in self.graph.moviesOf(person):
+                    for costar in self.graph.starsOf(movie):
+                        if distances[costar] == -1 or distances[person] + 1 < distances[costar]:
+                            distances[costar] = distances[person] + 1
+                            changed.append(costar)
+
+    def rebased(self, graph):
+        """
+        Returns this index for graph, a copy of this one's graph whose
+        people may be numbered differently, such as its compacted form.
+        """
+        people = [self.graph.personIndex(personId) for personId in graph.personIds]
+        landmarks = [graph.personIndex(self.graph.personIds[landmark])
+                     for landmark in self.landmarks]
+        distances = [array("h", (landmarkDistances[person] for person in people))
+                     for landmarkDistances in self.distances]
+        return LandmarkIndex(graph, landmarks, distances)
+
+    def indexBounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the separation of two person
+        indices. lower is None when a landmark proves they are not
+        connected, and upper is None when no landmark reaches both.
+        """
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            sourceDistance = distances[source]
+            targetDistance = distances[target]
+            if (sourceDistance == -1) != (targetDistance == -1):
+                return None, None
+            if sourceDistance == -1:
+                continue
+            lower = max(lower, abs(sourceDistance - targetDistance))
+            if upper is None or sourceDistance + targetDistance < upper:
+                upper = sourceDistance + targetDistance
+        return lower, upper
+
+    def bounds(self, sourceId, targetId):
+        """ indexBounds for two IMDB person ids """
+        return self.indexBounds(self.graph.personIndex(sourceId),
+                                self.graph.personIndex(targetId))
+
+    def shortestPath(self, sourceId, targetId):
+        """
+        Breadth first search between two IMDB person ids that skips
+        anyone whose depth plus landmark lower bound to the target
+        exceeds the landmark upper bound, since no shortest path goes
+        through them. Returns the same path as shortest_path, or None
+        if they are not connected.
+        """
+        graph = self.graph
+        source = graph.personIndex(sourceId)
+        target = graph.personIndex(targetId)
+        self.lastExpanded = 0
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+        lower, upper = self.indexBounds(source, target)
+        if lower is None:
+            return None
+
+        personOffsets = graph.personOffsets
+        personMovies = graph.personMovies
+        movieOffsets = graph.movieOffsets
+        movieStars = graph.movieStars
+        addedPersonMovies = graph.addedPersonMovies
+        addedMovieStars = graph.addedMovieStars
+
+        # Everyone the search reaches shares the source's component, which
+        # the bounds showed is the target's, so landmarks outside it never
+        # help. Of the rest, only those bounding this pair best are used.
+        guides = sorted(((distances, distances[target]) for distances in self.distances
+                         if distances[target] != -1),
+                        key=lambda guide: abs(guide[0][source] - guide[1]),
+                        reverse=True)[:ACTIVE_LANDMARKS]
+
+        # Maps reached people to the (person, movie) they were reached
+        # from, or to None for the source and pruned people
+        parents = {source: None}
+        exploredMovies = set()
+        layer = [source]
+        depth = 0
+        while layer:
+            depth += 1
+            nextLayer = []
+            for person in layer:
+                self.lastExpanded += 1
+                movieList, first, last = personMovies, personOffsets[person], personOffsets[person + 1]
+                if addedPersonMovies and person in addedPersonMovies:
+                    movieList = graph.moviesOf(person)
+                    first, last = 0, len(movieList)
+                for i in range(first, last):
+                    movie = movieList[i]
+                    if movie in exploredMovies:
+                        continue
+                    exploredMovies.add(movie)
+                    starList, start, end = movieStars, movieOffsets[movie], movieOffsets[movie + 1]
+                    if addedMovieStars and movie in addedMovieStars:
+                        starList = graph.starsOf(movie)
+                        start, end = 0, len(starList)
+                    for j in range(start, end):
+                        costar = starList[j]
+                        if costar in parents:
+                            continue
+                        if upper is not None:
+                            estimate = 0
+                            for distances, targetDistance in guides:
+                                difference = distances[costar] - targetDistance
+                                if difference > estimate:
+                                    estimate = difference
+                                elif -difference > estimate:
+                                    estimate = -difference
+                            if depth + estimate > upper:
+                                parents[costar] = None
+                                continue
+                        parents[costar] = (person, movie)
+                        if costar == target:
+                            return self.pathTo(target, parents)
+                        nextLayer.append(costar)
+            layer = nextLayer
+        return None
+
+    def pathTo(self, target, parents):
+        """ Rebuilds the (movie_id, person_id) path to target from shortestPath's parents """
+        graph = self.graph
+        path = []
+        person = target
+        while parents[person] is not None:
+            previous, movie = parents[person]
+            path.append((graph.movieIds[movie], graph.personIds[person]))
+            person = previous
+        path.reverse()
+        return path
+
+
+def indexPath(directory):
+    """ Returns where the landmark index for a data directory is stored """
+    return os.path.join(directory, INDEX_NAME)
+
+
+def loadGraph(directory):
+    """ Loads the directory's data into degrees as a compact StarGraph """
+    import degrees
+    print("Loading data...")
+    degrees.load_data(directory)
+    if degrees.graph is None:
+        degrees.useCompactGraph()
+    print("Data loaded.")
+    return degrees.graph
+
+
+def build(directory, count):
+    graph = loadGraph(directory)
+    start = time.perf_counter()
+    index = LandmarkIndex.build(graph, count)
+    index.save(indexPath(directory))
+    elapsed = time.perf_counter() - start
+    print(f"{count} landmarks indexed in {elapsed:.2f}s, written to {indexPath(directory)}.")
+
+
+def bench(directory, queries):
+    graph = loadGraph(directory)
+    index = LandmarkIndex.load(indexPath(directory), graph)
+    generator = random.Random(SEED)
+    pairs = [(generator.choice(graph.personIds), generator.choice(graph.personIds))
+             for _ in range(queries)]
+
+    bfsTime = landmarkTime = 0
+    bfsReached = landmarkExpanded = 0
+    exactBounds = 0
+    for sourceId, targetId in pairs:
+        start = time.perf_counter()
+        bfsPath = graph.shortestPath(sourceId, targetId)
+        bfsTime += time.perf_counter() - start
+        source = graph.personIndex(sourceId)
+        target = graph.personIndex(targetId)
+        distances = graph.search(source, [target])[0]
+        bfsReached += len(distances) - distances.count(-1)
+
+        start = time.perf_counter()
+        landmarkPath = index.shortestPath(sourceId, targetId)
+        landmarkTime += time.perf_counter() - start
+        landmarkExpanded += index.lastExpanded
+
+        if (bfsPath is None) != (landmarkPath is None) or (
+            bfsPath is not None and len(bfsPath) != len(landmarkPath)
+        ):
+            sys.exit(f"Mismatch between BFS and landmark search for {sourceId}, {targetId}")
+        lower, upper = index.bounds(sourceId, targetId)
+        if bfsPath is not None and lower == upper:
+            exactBounds += 1
+
+    print(f"{queries} queries, {len(index.landmarks)} landmarks")
+    print(f"BFS:      {bfsTime / queries * 1000:.3f} ms/query, "
+          f"{bfsReached / queries:.1f} people reached/query")
+    print(f"Landmark: {landmarkTime / queries * 1000:.3f} ms/query, "
+          f"{landmarkExpanded / queries:.1f} people expanded/query")
+    print(f"Bounds alone were exact for {exactBounds} queries")
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4 or sys.argv[1] not in ("build", "bench"):
+        sys.exit("Usage: python landmarks.py build|bench [directory] [landmarks|queries]")
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    if sys.argv[1] == "build":
+        build(directory, int(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_LANDMARKS)
+    else:
+        bench(directory, int(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_QUERIES)
+
+
+if __name__ == "__main__":
+    main()
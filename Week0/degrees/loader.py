@@ -0,0 +1,188 @@
+"""
+Streaming, filtered loading of the degrees CSV files
+"""
+
+import csv
+import io
+import tracemalloc
+
+# Rows read between checks of the memory budget
+BUDGET_CHECK_INTERVAL = 1000
+
+
+class MemoryBudgetError(Exception):
+    """ Raised when a filtered load grows past its memory budget """
+
+
+class LoadFilter():
+    """
+    Describes the part of the dataset a job needs. Every criterion is
+    optional: movies can be limited to a range of years, people to a
+    set of ids and to those credited in at least minMovies of the kept
+    movies, and the whole load to memoryBudget bytes.
+    """
+
+    def __init__(self, minYear=None, maxYear=None, minMovies=None,
+                 personIds=None, memoryBudget=None):
+        self.minYear = minYear
+        self.maxYear = maxYear
+        self.minMovies = minMovies
+        self.personIds = set(personIds) if personIds is not None else None
+        self.memoryBudget = memoryBudget
+
+    def keepsMovie(self, year):
+        """ Returns True if a movie released in year passes the year range """
+        if self.minYear is None and self.maxYear is None:
+            return True
+        if not year.isdigit():
+            return False
+        if self.minYear is not None and int(year) < self.minYear:
+            return False
+        if self.maxYear is not None and int(year) > self.maxYear:
+            return False
+        return True
+
+    def keepsPerson(self, personId):
+        """ Returns True if personId passes the people subset """
+        return self.personIds is None or personId in self.personIds
+
+
+class MemoryBudget():
+    """ Tracks memory allocated since a load started against a byte limit """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.startedTracing = False
+        if limit is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.startedTracing = True
+        self.baseline = tracemalloc.get_traced_memory()[0] if limit is not None else 0
+        self.rows = 0
+
+    def check(self, stage):
+        """ Raises MemoryBudgetError every so many rows if over the limit """
+        if self.limit is None:
+            return
+        self.rows += 1
+        if self.rows % BUDGET_CHECK_INTERVAL:
+            return
+        used = tracemalloc.get_traced_memory()[0] - self.baseline
+        if used > self.limit:
+            self.stop()
+            raise MemoryBudgetError(
+                f"loading {stage} used {used} bytes, over the budget of {self.limit}")
+
+    def stop(self):
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+
+def streamData(directory, loadFilter, names, people, movies, offsets=None):
+    """
+    Streams the CSV files in directory into the names, people and
+    movies dictionaries, keeping only rows that pass loadFilter. The
+    byte offset each file was read up to is recorded in offsets.
+
+    Returns a dictionary counting what was loaded, and the credits in
+    stars.csv that were skipped because their person or movie was
+    filtered out or does not exist.
+    """
+    report = {"people": 0, "movies": 0, "credits": 0, "skippedCredits": 0}
+    budget = MemoryBudget(loadFilter.memoryBudget)
+    try:
+        # Movies first, since the year range decides which credits count
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if loadFilter.keepsMovie(row["year"]):
+                    movies[row["id"]] = {
+                        "title": row["title"],
+                        "year": row["year"],
+                        "stars": set(),
+                    }
+                    report["movies"] += 1
+                budget.check("movies")
+            recordOffset(offsets, "movies.csv", f)
+
+        # Count credits in kept movies only if people are filtered on them
+        credits = None
+        if loadFilter.minMovies is not None:
+            credits = {}
+            with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    personId = row["person_id"]
+                    if row["movie_id"] in movies and loadFilter.keepsPerson(personId):
+                        credits[personId] = credits.get(personId, 0) + 1
+                    budget.check("credit counts")
+
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if not loadFilter.keepsPerson(row["id"]):
+                    continue
+                if credits is not None and credits.get(row["id"], 0) < loadFilter.minMovies:
+                    continue
+                people[row["id"]] = {
+                    "name": row["name"],
+                    "birth": row["birth"],
+                    "movies": set(),
+                }
+                names.setdefault(row["name"].lower(), set()).add(row["id"])
+                report["people"] += 1
+                budget.check("people")
+            recordOffset(offsets, "people.csv", f)
+        credits = None
+
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                personId = row["person_id"]
+                movieId = row["movie_id"]
+                if personId in people and movieId in movies:
+                    people[personId]["movies"].add(movieId)
+                    movies[movieId]["stars"].add(personId)
+                    report["credits"] += 1
+                else:
+                    report["skippedCredits"] += 1
+                budget.check("credits")
+            recordOffset(offsets, "stars.csv", f)
+    finally:
+        budget.stop()
+    return report
+
+
+def recordOffset(offsets, name, f):
+    """ Records how far a fully read CSV file was read, if offsets are kept """
+    if offsets is not None:
+        offsets[name] = f.tell()
+
+
+def readAppended(directory, offsets):
+    """
+    Reads the rows appended to people.csv, movies.csv and stars.csv
+    since the byte offsets recorded when they were last read.
+
+    Returns (rows, offsets), where rows maps each file name to a list
+    of row dictionaries and offsets are the new positions to read from.
+    Only complete lines are read: a last line still being written, with
+    no newline yet, is left for the next read.
+    Raises an Exception if a file has no recorded offset or has shrunk,
+    since then it was rewritten and must be loaded from scratch.
+    """
+    rows = {}
+    newOffsets = {}
+    for name in ("people.csv", "movies.csv", "stars.csv"):
+        if name not in offsets:
+            raise Exception(f"no read offset recorded for {name}, reload the data instead")
+        with open(f"{directory}/{name}", "rb") as f:
+            fieldnames = next(csv.reader([f.readline().decode("utf-8")]))
+            size = f.seek(0, 2)
+            if size < offsets[name]:
+                raise Exception(f"{name} has shrunk since it was read, reload the data instead")
+            f.seek(offsets[name])
+            appended = f.read()
+
+        # Stop after the last newline
+        complete = appended[:appended.rfind(b"\n") + 1]
+        lines = io.StringIO(complete.decode("utf-8"), newline="")
+        rows[name] = list(csv.DictReader(lines, fieldnames=fieldnames))
+        newOffsets[name] = offsets[name] + len(complete)
+    return rows, newOffsets
@@ -0,0 +1,153 @@
+"""
+Sorted name index for degrees with exact, prefix and fuzzy lookups
+"""
+
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+# Largest edit distance fuzzy resolution will accept for a name
+MAX_FUZZY_DISTANCE = 2
+
+
+def normalize(name):
+    """
+    Returns name lowercased, with accents stripped and runs of
+    whitespace collapsed, so "  Renée  Zellweger" matches "renee zellweger".
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.lower().split())
+
+
+class NameIndex():
+    """
+    Normalized names kept in one sorted list with a parallel list of
+    person ids. Names sharing a prefix are contiguous, so the sorted
+    list doubles as an implicit trie for fuzzy matching.
+    """
+
+    def __init__(self, entries):
+        entries = sorted((normalize(name), personId) for name, personId in entries)
+        self.keys = [key for key, _ in entries]
+        self.personIds = [personId for _, personId in entries]
+
+    @classmethod
+    def fromPeople(cls, people):
+        """ Indexes the names in a degrees people mapping """
+        return cls((person["name"], personId) for personId, person in people.items())
+
+    @classmethod
+    def fromGraph(cls, graph):
+        """ Indexes the names in a StarGraph, without building any person's movies """
+        return cls(zip(graph.personNames, graph.personIds))
+
+    def add(self, name, personId):
+        """ Indexes one more person, keeping the keys sorted """
+        key = normalize(name)
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.personIds.insert(i, personId)
+
+    def exact(self, name):
+        """ Returns the person ids whose normalized name equals name's """
+        key = normalize(name)
+        i = bisect_left(self.keys, key)
+        matches = []
+        while i < len(self.keys) and self.keys[i] == key:
+            matches.append(self.personIds[i])
+            i += 1
+        return matches
+
+    def prefix(self, prefix, limit=None):
+        """ Returns up to limit person ids whose normalized name starts with prefix """
+        key = normalize(prefix)
+        i = bisect_left(self.keys, key)
+        matches = []
+        while i < len(self.keys) and self.keys[i].startswith(key):
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.append(self.personIds[i])
+            i += 1
+        return matches
+
+    def fuzzy(self, name, maxDistance=MAX_FUZZY_DISTANCE, limit=None):
+        """
+        Returns up to limit (distance, person_id) pairs for names within
+        maxDistance edits of name, closest first.
+
+        Walks the sorted keys as a trie, carrying one Levenshtein row per
+        prefix and abandoning a prefix as soon as every entry in its row
+        exceeds maxDistance.
+        """
+        query = normalize(name)
+        length = len(query)
+        cap = maxDistance + 1
+        keys = self.keys
+        matches = []
+
+        def walk(low, high, depth, row):
+            while low < high:
+                key = keys[low]
+                if len(key) == depth:
+                    # key is exactly the current prefix
+                    if row[-1] <= maxDistance:
+                        matches.append((row[-1], key, self.personIds[low]))
+                    low += 1
+                    continue
+
+                char = key[depth]
+                end = bisect_left(keys, key[:depth] + chr(ord(char) + 1), low, high)
+
+                # Only cells within maxDistance of the diagonal can stay
+                # within maxDistance, so everything else is left capped
+                nextRow = [cap] * (length + 1)
+                first = max(1, depth + 1 - maxDistance)
+                last = min(length, depth + 1 + maxDistance)
+                if depth + 1 <= maxDistance:
+                    nextRow[0] = depth + 1
+                best = nextRow[0]
+                for i in range(first, last + 1):
+                    cell = min(nextRow[i - 1] + 1, row[i] + 1,
+                               row[i - 1] + (query[i - 1] != char))
+                    nextRow[i] = cell
+                    if cell < best:
+                        best = cell
+                if best <= maxDistance:
+                    walk(low, end, depth + 1, nextRow)
+                low = end
+
+        walk(0, len(keys), 0, [min(i, cap) for i in range(length + 1)])
+        matches.sort()
+        if limit is not None:
+            matches = matches[:limit]
+        return [(distance, personId) for distance, _, personId in matches]
+
+    def resolve(self, name, people, birth=None):
+        """
+        Picks one person id for name without prompting, or returns None.
+
+        Exact matches are preferred to fuzzy ones, and only the closest
+        fuzzy matches are kept, all found in one walk of the keys at
+        MAX_FUZZY_DISTANCE. Among the candidates,
+        a birth year hint keeps only people born that year (when any
+        are), and then the person who starred in the most movies wins.
+        """
+        candidates = [(0, personId) for personId in self.exact(name)]
+        if not candidates:
+            # fuzzy returns the matches closest first
+            candidates = self.fuzzy(name, MAX_FUZZY_DISTANCE)
+            if not candidates:
+                return None
+            closest = candidates[0][0]
+            candidates = [candidate for candidate in candidates if candidate[0] == closest]
+
+        if birth is not None:
+            born = [candidate for candidate in candidates
+                    if people[candidate[1]]["birth"] == str(birth)]
+            candidates = born or candidates
+
+        def preference(candidate):
+            distance, personId = candidate
+            return (distance, -len(people[personId]["movies"]), personId)
+
+        return min(candidates, key=preference)[1]
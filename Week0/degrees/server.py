@@ -0,0 +1,217 @@
+"""
+Batch and HTTP server modes for degrees, answering many
+source/target pairs against one loaded copy of the data.
+
+Usage: python server.py batch [directory] [pairs file]
+       python server.py serve [directory] [port]
+
+Batch mode reads one pair per line from the pairs file (or stdin),
+either as a JSON object {"source": ..., "target": ...} or as two names
+separated by a tab, and writes one JSON result per line to stdout.
+A line that is not a valid pair gets {"line": ..., "error": ...}.
+Serve mode answers GET /path?source=...&target=... and POST /paths
+with a JSON list of pairs. Sources and targets may be names or
+IMDB person ids; ambiguous or misspelled names are resolved with the
+degrees name index policy.
+"""
+
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+# Number of batch lines grouped by source before being answered
+BATCH_SIZE = 1000
+DEFAULT_PORT = 8050
+
+
+def resolvePerson(text):
+    """
+    Returns (person_id, error) for a name or IMDB person id, without
+    ever prompting for ambiguous or misspelled names.
+    """
+    if text in degrees.people:
+        return text, None
+    personId = degrees.person_id_for_name(text, interactive=False)
+    if personId is None:
+        return None, f"person not found: {text}"
+    return personId, None
+
+
+def answerPairs(pairs):
+    """
+    Answers a list of (source, target) pairs, returning one result
+    dictionary per pair in the same order. Pairs that share a source
+    are answered by a single search.
+    """
+    results = [None] * len(pairs)
+    targetsBySource = {}  # Maps source ids to [(pair index, target id)]
+    for i, (sourceText, targetText) in enumerate(pairs):
+        source, sourceError = resolvePerson(sourceText)
+        target, targetError = resolvePerson(targetText)
+        if sourceError or targetError:
+            results[i] = {"source": sourceText, "target": targetText,
+                          "error": sourceError or targetError}
+        else:
+            targetsBySource.setdefault(source, []).append((i, target))
+
+    for source, entries in targetsBySource.items():
+        paths = degrees.shortest_paths(source, [target for _, target in entries])
+        for i, target in entries:
+            sourceText, targetText = pairs[i]
+            results[i] = describePath(sourceText, targetText, source, paths[target])
+    return results
+
+
+def describePath(sourceText, targetText, source, path):
+    """ Returns the JSON result for one answered pair """
+    result = {"source": sourceText, "target": targetText}
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = []
+    previous = source
+    for movieId, personId in path:
+        result["path"].append({
+            "from": degrees.people[previous]["name"],
+            "to": degrees.people[personId]["name"],
+            "person_id": personId,
+            "movie_id": movieId,
+            "title": degrees.movies[movieId]["title"],
+        })
+        previous = personId
+    return result
+
+
+def parsePair(line):
+    """
+    Parses a batch input line into a (source, target) pair, or None if
+    blank. Raises ValueError if the line is not a valid pair.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        return pairFrom(json.loads(line))
+    parts = line.split("\t")
+    if len(parts) != 2:
+        raise ValueError("expected a source and a target separated by a tab")
+    return parts[0].strip(), parts[1].strip()
+
+
+def pairFrom(value):
+    """
+    Returns the (source, target) pair of a decoded JSON object, raising
+    ValueError if it is not an object with string source and target.
+    """
+    try:
+        source, target = value["source"], value["target"]
+    except (KeyError, TypeError):
+        raise ValueError("expected a JSON object with source and target")
+    if not isinstance(source, str) or not isinstance(target, str):
+        raise ValueError("source and target must be strings")
+    return source, target
+
+
+def parseLines(lines):
+    """
+    Yields a (source, target) pair for each non-blank line, or an error
+    result for a line that is not a valid pair.
+    """
+    for line in lines:
+        try:
+            pair = parsePair(line)
+        except ValueError as e:
+            yield {"line": line.rstrip("\r\n"), "error": str(e)}
+            continue
+        if pair is not None:
+            yield pair
+
+
+def runBatch(lines, output):
+    """
+    Answers every pair in lines, writing JSON lines to output in input
+    order. Lines that are not valid pairs get an error result.
+    """
+    entries = parseLines(lines)
+    while True:
+        chunk = list(islice(entries, BATCH_SIZE))
+        if not chunk:
+            break
+        pairs = [entry for entry in chunk if isinstance(entry, tuple)]
+        answers = iter(answerPairs(pairs))
+        for entry in chunk:
+            result = next(answers) if isinstance(entry, tuple) else entry
+            output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+class DegreesHandler(BaseHTTPRequestHandler):
+    """ Answers shortest path queries against the loaded degrees data """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/path":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        if "source" not in query or "target" not in query:
+            self.send_error(400, "source and target are required")
+            return
+        self.sendJson(answerPairs([(query["source"][0], query["target"][0])])[0])
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/paths":
+            self.send_error(404)
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            pairs = [pairFrom(pair) for pair in json.loads(body)]
+        except (ValueError, TypeError):
+            self.send_error(400, "expected a JSON list of {source, target} pairs")
+            return
+        self.sendJson(answerPairs(pairs))
+
+    def sendJson(self, value):
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4 or sys.argv[1] not in ("batch", "serve"):
+        sys.exit("Usage: python server.py batch|serve [directory] [pairs file|port]")
+    mode = sys.argv[1]
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    if mode == "batch":
+        if len(sys.argv) == 4:
+            with open(sys.argv[3], encoding="utf-8") as f:
+                runBatch(f, sys.stdout)
+        else:
+            runBatch(sys.stdin, sys.stdout)
+    else:
+        port = int(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_PORT
+        server = ThreadingHTTPServer(("127.0.0.1", port), DegreesHandler)
+        print(f"Serving on http://127.0.0.1:{port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Binary snapshot of a degrees StarGraph, memory mapped on load
+
+Usage: python snapshot.py [directory]
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+
+from graph import StarGraph
+
+SNAPSHOT_NAME = "degrees.snapshot"
+MAGIC = b"DEGSNAP1"
+CSV_NAMES = ("people.csv", "movies.csv", "stars.csv")
+
+# StarGraph attributes stored in a snapshot, by kind of section
+INT_SECTIONS = ("personOffsets", "personMovies", "movieOffsets", "movieStars", "nameOrder")
+STRING_SECTIONS = ("personIds", "movieIds", "personNames", "personBirths",
+                   "movieTitles", "movieYears")
+
+
+class StringTable(Sequence):
+    """
+    Sequence of strings stored as one UTF-8 blob plus an offsets array,
+    decoding each string only when it is accessed.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def snapshotPath(directory):
+    """ Returns where the snapshot for a data directory is stored """
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def isFresh(directory):
+    """
+    Returns True if directory has a snapshot that is newer than all
+    of the CSV files it was built from.
+    """
+    path = snapshotPath(directory)
+    if not os.path.exists(path):
+        return False
+    built = os.path.getmtime(path)
+    for name in CSV_NAMES:
+        source = os.path.join(directory, name)
+        if os.path.exists(source) and os.path.getmtime(source) > built:
+            return False
+    return True
+
+
+def writeSnapshot(path, graph, sourceSizes=None):
+    """
+    Writes graph to path as a binary snapshot, recording sourceSizes,
+    the byte size of each CSV file the graph was built from. The file
+    is written beside path and then renamed over it, so a snapshot that
+    is currently memory mapped stays intact.
+    """
+    if graph.nameOrder is None:
+        graph.nameOrder = graph.buildNameOrder()
+
+    sections = []  # (name, kind, bytes) in file order
+    for name in INT_SECTIONS:
+        sections.append((name, "i", array("i", getattr(graph, name)).tobytes()))
+    for name in STRING_SECTIONS:
+        encoded = [value.encode("utf-8") for value in getattr(graph, name)]
+        offsets = array("q", [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        sections.append((name + ".offsets", "q", offsets.tobytes()))
+        sections.append((name + ".blob", "B", b"".join(encoded)))
+
+    # Lay the sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, kind, data in sections:
+        layout[name] = {"kind": kind, "offset": position, "size": len(data)}
+        position += align(len(data))
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "sections": layout,
+        "sourceSizes": sourceSizes or {},
+    }).encode("utf-8")
+    headerSize = align(len(MAGIC) + 8 + len(header))
+
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(bytes(headerSize - f.tell()))
+        for name, kind, data in sections:
+            f.write(data)
+            f.write(bytes(align(len(data)) - len(data)))
+    os.replace(temporaryPath, path)
+
+
+def readSnapshot(path):
+    """
+    Memory maps a snapshot written by writeSnapshot and returns
+    (graph, sourceSizes), where the StarGraph's arrays and strings are
+    views into the mapping.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise Exception(f"{path} is not a degrees snapshot")
+    headerLength = int.from_bytes(view[len(MAGIC):len(MAGIC) + 8], "little")
+    header = json.loads(str(view[len(MAGIC) + 8:len(MAGIC) + 8 + headerLength], "utf-8"))
+    if header["byteorder"] != sys.byteorder:
+        raise Exception(f"{path} was written on a {header['byteorder']} endian machine")
+    start = align(len(MAGIC) + 8 + headerLength)
+
+    def section(name):
+        info = header["sections"][name]
+        data = view[start + info["offset"]:start + info["offset"] + info["size"]]
+        return data.cast(info["kind"])
+
+    fields = {name: section(name) for name in INT_SECTIONS}
+    for name in STRING_SECTIONS:
+        fields[name] = StringTable(section(name + ".offsets"), section(name + ".blob"))
+    return StarGraph(**fields), header.get("sourceSizes", {})
+
+
+def align(size):
+    """ Rounds size up to a multiple of 8 bytes """
+    return (size + 7) // 8 * 8
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    import degrees
+    print("Loading data...")
+    degrees.USE_SNAPSHOT = False
+    degrees.load_data(directory)
+    graph = StarGraph.fromData(degrees.people, degrees.movies)
+    writeSnapshot(snapshotPath(directory), graph, degrees.loadedOffsets)
+    print(f"Snapshot written to {snapshotPath(directory)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Synthetic people/movies/stars CSV generator for benchmarking degrees
+
+Usage: python synthetic.py directory [credits] [seed]
+
+Writes people.csv, movies.csv and stars.csv with about the requested
+number of star credits (default 100000). Cast sizes follow a power law
+and a few prolific people appear in many movies, like the IMDb data.
+"""
+
+import csv
+import os
+import random
+import sys
+
+DEFAULT_CREDITS = 100000
+SEED = 50
+
+# Shape of the generated graph
+CAST_ALPHA = 1.6  # Pareto shape of cast sizes, smaller means heavier tail
+MIN_CAST = 2
+MAX_CAST = 200
+POPULARITY_SKEW = 2.5  # Larger values concentrate credits on fewer people
+CREDITS_PER_PERSON = 3  # Average credits per person, which sets the number of people
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+               "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+               "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Maria",
+               "Kevin", "Emma", "Tom", "Sally", "Gary", "Robin", "Demi", "Jack", "Cary"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+              "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson",
+              "Taylor", "Moore", "Jackson", "Martin", "Lee", "Thompson", "White", "Harris",
+              "Bacon", "Hanks", "Cruise", "Field", "Sinise", "Wright", "Watson", "Paxton"]
+
+
+def castSize(generator):
+    """ Draws a power law distributed cast size """
+    return min(MAX_CAST, int(MIN_CAST * generator.paretovariate(CAST_ALPHA)))
+
+
+def generate(directory, credits=DEFAULT_CREDITS, seed=SEED):
+    """
+    Writes a synthetic dataset to directory and returns the number of
+    (people, movies, credits) written.
+    """
+    generator = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    peopleCount = max(MIN_CAST, credits // CREDITS_PER_PERSON)
+
+    written = 0
+    movieCount = 0
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as movieFile, \
+         open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as starFile:
+        movieWriter = csv.writer(movieFile)
+        starWriter = csv.writer(starFile)
+        movieWriter.writerow(["id", "title", "year"])
+        starWriter.writerow(["person_id", "movie_id"])
+        while written < credits:
+            movieId = 1000000 + movieCount
+            movieCount += 1
+            movieWriter.writerow([movieId, f"Movie {movieCount}", generator.randint(1920, 2020)])
+
+            # Skewed draws make low person ids the prolific stars
+            cast = set()
+            for _ in range(min(castSize(generator), peopleCount)):
+                cast.add(int(peopleCount * generator.random() ** POPULARITY_SKEW))
+            for person in cast:
+                starWriter.writerow([person + 1, movieId])
+            written += len(cast)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(peopleCount):
+            name = f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)}"
+            writer.writerow([person + 1, name, generator.randint(1900, 2005)])
+
+    return peopleCount, movieCount, written
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        sys.exit("Usage: python synthetic.py directory [credits] [seed]")
+    directory = sys.argv[1]
+    credits = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CREDITS
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else SEED
+
+    people, movies, written = generate(directory, credits, seed)
+    print(f"Wrote {people} people, {movies} movies and {written} credits to {directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,99 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class SearchTree():
+    """
+    Result of a breadth first search from a single source: the distance
+    of every person reached and the (movie_id, person_id) each was
+    reached from.
+    """
+
+    def __init__(self, source, distances, parents):
+        self.source = source
+        self.distances = distances
+        self.parents = parents
+
+    def __len__(self):
+        return len(self.distances)
+
+    def distance(self, personId):
+        """ Returns the degrees of separation to personId, or None if not reached """
+        return self.distances.get(personId)
+
+    def within(self, degrees):
+        """ Returns the set of people at most degrees away from the source """
+        return {personId for personId, distance in self.distances.items()
+                if distance <= degrees}
+
+    def histogram(self):
+        """ Returns a dictionary mapping each distance to how many people are that far away """
+        counts = {}
+        for distance in self.distances.values():
+            counts[distance] = counts.get(distance, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def pathTo(self, target):
+        """
+        Returns the list of (movie_id, person_id) pairs leading from the
+        source to target, or None if target was not reached.
+        """
+        if target not in self.parents:
+            return None
+        path = []
+        personId = target
+        while self.parents[personId] is not None:
+            movieId, previousId = self.parents[personId]
+            path.append((movieId, personId))
+            personId = previousId
+        path.reverse()
+        return path
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a count of the queued states
+    so that add, remove and contains_state are all constant time.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}  # Maps queued states to how many times they are queued
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.forget(node.state)
+            return node
+
+    def forget(self, state):
+        """ Drops one queued occurrence of state from the state index """
+        count = self.states[state] - 1
+        if count == 0:
+            del self.states[state]
+        else:
+            self.states[state] = count
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.forget(node.state)
+            return node
@@ -0,0 +1,69 @@
+"""
+Background thread computing the Tic Tac Toe AI's moves, so that the
+game loop keeps drawing and handling input while minimax searches
+"""
+
+import queue
+import threading
+
+import tictactoe as ttt
+
+
+class AIWorker():
+    """
+    Runs minimax on a daemon thread. request starts a search for a
+    board, poll returns its move once it is ready, and cancel abandons
+    it; a newer request also cancels the one before it.
+    """
+
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.current = None  # (request id, cancel event) of the latest request
+        self.response = None  # (request id, action) of the latest finished search
+        self.nextId = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, board):
+        """ Starts searching for the move on board, cancelling any earlier request """
+        with self.lock:
+            if self.current is not None:
+                self.current[1].set()
+            self.nextId += 1
+            self.current = (self.nextId, threading.Event())
+            self.response = None
+            self.requests.put((self.current, [row[:] for row in board]))
+
+    def poll(self):
+        """
+        Returns the action found for the latest request, or None if it
+        is still being searched (or was cancelled).
+        """
+        with self.lock:
+            if self.current is None or self.response is None:
+                return None
+            requestId, action = self.response
+            if requestId != self.current[0]:
+                return None
+            self.current = None
+            self.response = None
+            return action
+
+    def cancel(self):
+        """ Abandons the latest request, if there is one """
+        with self.lock:
+            if self.current is not None:
+                self.current[1].set()
+            self.current = None
+            self.response = None
+
+    def run(self):
+        while True:
+            (requestId, cancelled), board = self.requests.get()
+            if cancelled.is_set():
+                continue
+            action = ttt.minimax(board, cancel=cancelled)
+            with self.lock:
+                if not cancelled.is_set():
+                    self.response = (requestId, action)
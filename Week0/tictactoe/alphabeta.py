@@ -0,0 +1,179 @@
+"""
+Alpha-beta search for Tic Tac Toe boards too large to solve exactly,
+deepened one ply at a time until a time budget runs out
+"""
+
+import math
+import time
+
+from searchstats import SearchStats
+
+# Seconds a search may take unless told otherwise, leaving headroom
+# within a 100 ms reply
+TIME_BUDGET = 0.09
+
+# Score of a win, less the plies it takes, so that sooner wins score higher
+WIN_SCORE = 1000000
+
+# Heuristic score of a position one side is about to win: the player
+# to move can complete a line, or the opponent threatens two at once
+THREAT_SCORE = WIN_SCORE // 2
+
+# Heuristic value of an open line grows by this factor per cell held in it
+LINE_FACTOR = 10
+
+# Nodes searched between checks of the clock
+CLOCK_INTERVAL = 256
+
+# How a transposition table score bounds the true value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SearchTimeout(Exception):
+    """ Raised inside a search that has run past its deadline or been cancelled """
+
+
+class AlphaBeta():
+    """
+    Negamax search with alpha-beta pruning over (mine, theirs) cell bits,
+    where mine belongs to the player to move. A transposition table
+    keeps each position's score and best cell across the iterations of
+    one iterative deepening search, and the best cell is tried first.
+    """
+
+    def __init__(self, geometry, deadline, cancel=None, stats=None):
+        self.geometry = geometry
+        self.deadline = deadline
+        self.cancel = cancel  # threading.Event that stops the search when set
+        self.stats = stats if stats is not None else SearchStats()
+        self.table = {}  # Maps (mine, theirs) to (depth, score, flag, best cell)
+        self.lineValues = [0] + [LINE_FACTOR ** (count - 1)
+                                 for count in range(1, geometry.numToWin)]
+
+    def search(self, mine, theirs, depth, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move,
+        looking depth plies ahead and then falling back on evaluate.
+        The opponent's last move is assumed not to have won.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if ply > stats.maxDepth:
+            stats.maxDepth = ply
+        if stats.nodes % CLOCK_INTERVAL == 0 and (
+            time.perf_counter() > self.deadline
+            or (self.cancel is not None and self.cancel.is_set())
+        ):
+            raise SearchTimeout()
+
+        geometry = self.geometry
+        if mine | theirs == geometry.full:
+            return 0
+        if depth == 0:
+            return self.evaluate(mine, theirs)
+
+        key = (mine, theirs)
+        entry = self.table.get(key)
+        firstCell = None
+        if entry is not None:
+            entryDepth, score, flag, firstCell = entry
+            if entryDepth >= depth and (
+                flag == EXACT
+                or (flag == LOWER and score >= beta)
+                or (flag == UPPER and score <= alpha)
+            ):
+                stats.transpositionHits += 1
+                return score
+
+        originalAlpha = alpha
+        bestScore = -math.inf
+        bestCell = None
+        for cell in self.ordered(mine, theirs, firstCell):
+            moved = mine | geometry.bits[cell]
+            if geometry.completes(moved, cell):
+                score = WIN_SCORE - ply - 1
+            else:
+                score = -self.search(theirs, moved, depth - 1, -beta, -alpha, ply + 1)
+            if score > bestScore:
+                bestScore = score
+                bestCell = cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                # The opponent will avoid this position, so stop short
+                stats.cutoffs += 1
+                break
+
+        if bestScore <= originalAlpha:
+            flag = UPPER
+        elif bestScore >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, bestScore, flag, bestCell)
+        return bestScore
+
+    def ordered(self, mine, theirs, firstCell):
+        """ Returns the empty cells, firstCell first if there is one """
+        cells = self.geometry.emptyCells(mine, theirs)
+        if firstCell is None:
+            return cells
+        return (firstCell,) + tuple(cell for cell in cells if cell != firstCell)
+
+    def evaluate(self, mine, theirs):
+        """
+        Scores a position the search stops at by its open lines: each
+        line only one player has cells in counts for them, more so the
+        more cells they hold in it. A line the player to move can
+        complete, or two the opponent could complete at different
+        cells, all but decides the game.
+        """
+        needed = self.geometry.numToWin - 1
+        score = 0
+        threats = 0  # Cells where the opponent would complete a line
+        for mask in self.geometry.winMasks:
+            if not mask & theirs:
+                count = bin(mask & mine).count("1")
+                if count == needed:
+                    return THREAT_SCORE
+                score += self.lineValues[count]
+            elif not mask & mine:
+                count = bin(mask & theirs).count("1")
+                if count == needed:
+                    threats |= mask & ~theirs
+                score -= self.lineValues[count]
+        if threats & (threats - 1):
+            return -THREAT_SCORE
+        return score
+
+
+def bestCell(geometry, x, o, budget=None, maxDepth=None, cancel=None, stats=None):
+    """
+    Returns the best cell for the player to move that iterative
+    deepening finds within budget seconds (TIME_BUDGET by default) and
+    maxDepth plies, if given, or None if the game is over. Setting the
+    cancel event stops the search early, as if its time were up. The
+    work done is counted in stats, if given.
+    """
+    if geometry.terminal(x, o):
+        return None
+    mine, theirs = (x, o) if geometry.xToMove(x, o) else (o, x)
+    empty = geometry.emptyCells(mine, theirs)
+    depthLimit = len(empty) if maxDepth is None else min(maxDepth, len(empty))
+
+    if budget is None:
+        budget = TIME_BUDGET
+    search = AlphaBeta(geometry, time.perf_counter() + budget, cancel, stats)
+    best = empty[0]
+    for depth in range(1, depthLimit + 1):
+        try:
+            score = search.search(mine, theirs, depth, -math.inf, math.inf, 0)
+        except SearchTimeout:
+            break
+        best = search.table[(mine, theirs)][3]
+        search.stats.completedDepth = depth
+        if abs(score) >= WIN_SCORE - geometry.cells:
+            # A forced win or loss has been found, deeper won't change it
+            break
+    return best
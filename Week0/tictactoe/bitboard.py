@@ -0,0 +1,196 @@
+"""
+Bitboard backend for Tic Tac Toe
+
+A position is two integers, the cells held by X and by O, where cell
+(i, j) is bit i * cols + j. A Geometry holds everything that depends
+only on the board's shape and win length; on small boards that
+includes tables indexed by one player's cell bits.
+"""
+
+from functools import lru_cache
+
+# Largest board whose per player tables are precomputed, in cells
+TABLE_CELLS = 12
+
+
+class Geometry():
+    """
+    A rows x cols board won by numToWin cells in a row, column or
+    diagonal, with its winning lines and symmetries precomputed.
+    """
+
+    def __init__(self, rows, cols, numToWin):
+        self.rows = rows
+        self.cols = cols
+        self.numToWin = numToWin
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+        self.bits = [1 << cell for cell in range(self.cells)]
+        self.winMasks = winMasks(rows, cols, numToWin)
+
+        # Winning lines through each cell, enough to test the last move
+        self.cellMasks = [[mask for mask in self.winMasks if mask >> cell & 1]
+                          for cell in range(self.cells)]
+
+        # Cells on the most lines first, which makes a good move order
+        self.cellOrder = sorted(range(self.cells),
+                                key=lambda cell: (-len(self.cellMasks[cell]), cell))
+        self.symmetries = symmetries(rows, cols)
+
+        # Maps canonicalKey of each position solved exactly to its value
+        self.transpositions = {}
+
+        self.wins = self.counts = self.emptyTable = self.symmetryTables = None
+        if self.cells <= TABLE_CELLS:
+            everySet = range(self.full + 1)
+            self.wins = bytearray(self.hasLine(bits) for bits in everySet)
+            self.counts = bytearray(bin(bits).count("1") for bits in everySet)
+            self.emptyTable = [self.orderedEmpty(occupied) for occupied in everySet]
+            self.symmetryTables = [[permuted(bits, symmetry) for bits in everySet]
+                                   for symmetry in self.symmetries]
+
+    def hasLine(self, bits):
+        """ Returns True if the cell bits include a whole winning line """
+        if self.wins is not None:
+            return self.wins[bits]
+        for mask in self.winMasks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def completes(self, bits, cell):
+        """ Returns True if bits has a winning line through cell """
+        for mask in self.cellMasks[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def xToMove(self, x, o):
+        """ Returns True if X has the next turn """
+        if self.counts is not None:
+            return self.counts[x] == self.counts[o]
+        return bin(x).count("1") == bin(o).count("1")
+
+    def winner(self, x, o):
+        """ Returns "X" or "O" if that player has a line, otherwise None """
+        if self.hasLine(x):
+            return "X"
+        if self.hasLine(o):
+            return "O"
+        return None
+
+    def terminal(self, x, o):
+        """ Returns True if either player has a line or the board is full """
+        return x | o == self.full or self.hasLine(x) or self.hasLine(o)
+
+    def utility(self, x, o):
+        """ Returns 1 if X has won, -1 if O has won, 0 otherwise """
+        if self.hasLine(x):
+            return 1
+        if self.hasLine(o):
+            return -1
+        return 0
+
+    def emptyCells(self, x, o):
+        """ Returns the cells neither player holds, in cellOrder """
+        if self.emptyTable is not None:
+            return self.emptyTable[x | o]
+        return self.orderedEmpty(x | o)
+
+    def orderedEmpty(self, occupied):
+        return tuple(cell for cell in self.cellOrder if not occupied >> cell & 1)
+
+    def canonicalKey(self, x, o):
+        """
+        Returns an integer encoding of the position that is the same
+        for all of its rotations and reflections.
+        """
+        if self.symmetryTables is not None:
+            return min(table[x] << self.cells | table[o] for table in self.symmetryTables)
+        return min(permuted(x, symmetry) << self.cells | permuted(o, symmetry)
+                   for symmetry in self.symmetries)
+
+    def fromBoard(self, board):
+        """ Returns the (x, o) cell bits of a list of lists board """
+        x = o = 0
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if board[row][col] == "X":
+                    x |= self.bits[row * self.cols + col]
+                elif board[row][col] == "O":
+                    o |= self.bits[row * self.cols + col]
+        return x, o
+
+    def toBoard(self, x, o):
+        """ Returns the list of lists board for the (x, o) cell bits """
+        return [["X" if x >> (row * self.cols + col) & 1 else
+                 "O" if o >> (row * self.cols + col) & 1 else None
+                 for col in range(self.cols)]
+                for row in range(self.rows)]
+
+
+@lru_cache(maxsize=None)
+def geometry(rows, cols, numToWin):
+    """ Returns the shared Geometry for a board shape and win length """
+    return Geometry(rows, cols, numToWin)
+
+
+def winMasks(rows, cols, numToWin):
+    """
+    Returns a mask for every line of numToWin cells in a row, column
+    or diagonal of a rows x cols board.
+    """
+    masks = []
+    for row in range(rows):
+        for col in range(cols):
+            for rowStep, colStep in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                lastRow = row + rowStep * (numToWin - 1)
+                lastCol = col + colStep * (numToWin - 1)
+                if not (0 <= lastRow < rows and 0 <= lastCol < cols):
+                    continue
+                mask = 0
+                for step in range(numToWin):
+                    mask |= 1 << ((row + rowStep * step) * cols + col + colStep * step)
+                masks.append(mask)
+    return masks
+
+
+def symmetries(rows, cols):
+    """
+    Returns the rotations and reflections of a rows x cols board (8 if
+    it is square, otherwise 4), each as the list of cells read in order
+    to produce it.
+    """
+    lastRow = rows - 1
+    lastCol = cols - 1
+    transforms = [
+        lambda row, col: (row, col),
+        lambda row, col: (lastRow - row, lastCol - col),
+        lambda row, col: (row, lastCol - col),
+        lambda row, col: (lastRow - row, col),
+    ]
+    if rows == cols:
+        transforms += [
+            lambda row, col: (col, lastRow - row),
+            lambda row, col: (lastCol - col, row),
+            lambda row, col: (col, row),
+            lambda row, col: (lastCol - col, lastRow - row),
+        ]
+    cells = []
+    for transform in transforms:
+        symmetry = []
+        for row in range(rows):
+            for col in range(cols):
+                fromRow, fromCol = transform(row, col)
+                symmetry.append(fromRow * cols + fromCol)
+        cells.append(symmetry)
+    return cells
+
+
+def permuted(bits, symmetry):
+    """ Returns bits with cell symmetry[i] moved to cell i """
+    moved = 0
+    for cell, fromCell in enumerate(symmetry):
+        if bits >> fromCell & 1:
+            moved |= 1 << cell
+    return moved
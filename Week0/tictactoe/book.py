@@ -0,0 +1,201 @@
+"""
+Opening book for Tic Tac Toe: every reachable position solved once,
+with its game theoretic value and a best move
+
+Usage: python book.py build [path]
+       python book.py verify [path]
+
+Books are for tictactoe's ROWS, COLS and NUM_TO_WIN, written by default
+to a file named after them, such as tictactoe-3x3-3.book.
+"""
+
+import sys
+import time
+
+BOOK_FILE = "tictactoe-{rows}x{cols}-{numToWin}.book"
+MAGIC = b"TTTBOOK1"
+
+# Largest board a book can hold: a move nibble of 0xF means no move
+MAX_CELLS = 15
+
+# Entry of a position that cannot be reached from the empty board
+UNREACHED = 0xFF
+
+# Move nibble of a finished position's entry
+NO_MOVE = 0xF
+
+
+class OpeningBook():
+    """
+    One byte per board of a given shape, indexed by reading the board
+    row by row as a base 3 number (empty 0, X 1, O 2). A reachable
+    position's byte holds its value plus one in the high four bits and
+    the cell of its best move in the low four.
+    """
+
+    def __init__(self, rows, cols, numToWin, entries):
+        self.rows = rows
+        self.cols = cols
+        self.numToWin = numToWin
+        self.entries = entries
+
+    @classmethod
+    def solve(cls):
+        """
+        Solves every position reachable from tictactoe's initial state
+        with its actions, result and utility functions.
+        """
+        import tictactoe as ttt
+
+        board = ttt.initial_state()
+        if len(board) * len(board[0]) > MAX_CELLS:
+            raise Exception(f"books hold boards of at most {MAX_CELLS} cells")
+        book = cls(len(board), len(board[0]), ttt.NUM_TO_WIN,
+                   bytearray([UNREACHED]) * 3 ** (len(board) * len(board[0])))
+
+        def solveFrom(board):
+            index = book.index(board)
+            if book.entries[index] != UNREACHED:
+                return (book.entries[index] >> 4) - 1
+
+            if ttt.terminal(board):
+                value = ttt.utility(board)
+                move = NO_MOVE
+            else:
+                sign = 1 if ttt.player(board) == ttt.X else -1
+                value = None
+                for action in sorted(ttt.actions(board)):
+                    actionValue = solveFrom(ttt.result(board, action))
+                    if value is None or actionValue * sign > value * sign:
+                        value = actionValue
+                        move = action[0] * book.cols + action[1]
+            book.entries[index] = (value + 1) << 4 | move
+            return value
+
+        solveFrom(board)
+        return book
+
+    @classmethod
+    def load(cls, path):
+        """ Reads a book written by save """
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise Exception(f"{path} is not a tictactoe opening book")
+        rows, cols, numToWin = data[len(MAGIC):len(MAGIC) + 3]
+        entries = data[len(MAGIC) + 3:]
+        if rows * cols > MAX_CELLS:
+            raise Exception(f"{path} is for a board of more than {MAX_CELLS} cells")
+        if len(entries) != 3 ** (rows * cols):
+            raise Exception(f"{path} is truncated")
+        return cls(rows, cols, numToWin, entries)
+
+    def save(self, path):
+        """ Writes the book to path """
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(bytes([self.rows, self.cols, self.numToWin]))
+            f.write(self.entries)
+
+    def covers(self, board, numToWin):
+        """ Returns True if the book is for boards of this shape and win length """
+        if len(board) * len(board[0]) > MAX_CELLS:
+            return False
+        return (len(board), len(board[0]), numToWin) == (self.rows, self.cols, self.numToWin)
+
+    def index(self, board):
+        """ Returns the board's entry index """
+        index = 0
+        for row in reversed(board):
+            for cell in reversed(row):
+                index = index * 3 + (0 if cell is None else 1 if cell == "X" else 2)
+        return index
+
+    def lookup(self, board):
+        """
+        Returns (value, action) for the board, where action is None if
+        the game is over, or None if the position is unreachable.
+        """
+        entry = self.entries[self.index(board)]
+        if entry == UNREACHED:
+            return None
+        move = entry & NO_MOVE
+        action = None if move == NO_MOVE else divmod(move, self.cols)
+        return (entry >> 4) - 1, action
+
+    def boards(self):
+        """ Yields every reachable board in the book """
+        cells = self.rows * self.cols
+        for index, entry in enumerate(self.entries):
+            if entry == UNREACHED:
+                continue
+            marks = []
+            for _ in range(cells):
+                index, mark = divmod(index, 3)
+                marks.append((None, "X", "O")[mark])
+            yield [marks[row * self.cols:(row + 1) * self.cols] for row in range(self.rows)]
+
+    def verify(self):
+        """
+        Cross checks the book against a live minimax search. Returns the
+        boards whose book value differs from the searched value, or whose
+        book move does not keep that value.
+        """
+        import tictactoe as ttt
+
+        mismatches = []
+        for board in self.boards():
+            value, action = self.lookup(board)
+            if ttt.terminal(board):
+                if action is not None or value != ttt.utility(board):
+                    mismatches.append(board)
+                continue
+            search = ttt.maxValue if ttt.player(board) == ttt.X else ttt.minValue
+            after = ttt.minValue if ttt.player(board) == ttt.X else ttt.maxValue
+            if value != search(board) or after(ttt.result(board, action)) != value:
+                mismatches.append(board)
+        return mismatches
+
+
+def bookFile(rows, cols, numToWin):
+    """ Returns the default book path for boards of this shape and win length """
+    return BOOK_FILE.format(rows=rows, cols=cols, numToWin=numToWin)
+
+
+def build(path):
+    start = time.perf_counter()
+    book = OpeningBook.solve()
+    book.save(path)
+    reachable = len(book.entries) - book.entries.count(UNREACHED)
+    print(f"Solved {reachable} positions in {time.perf_counter() - start:.3f}s, "
+          f"written to {path}.")
+
+
+def verify(path):
+    start = time.perf_counter()
+    book = OpeningBook.load(path)
+    print(f"Loaded {path} in {(time.perf_counter() - start) * 1000:.2f} ms.")
+    mismatches = book.verify()
+    for board in mismatches[:10]:
+        print(f"Mismatch: {board}")
+    if mismatches:
+        sys.exit(f"{len(mismatches)} positions disagree with minimax.")
+    print("Every position agrees with minimax.")
+
+
+def main():
+    if len(sys.argv) not in (2, 3) or sys.argv[1] not in ("build", "verify"):
+        sys.exit("Usage: python book.py build|verify [path]")
+    if len(sys.argv) == 3:
+        path = sys.argv[2]
+    else:
+        import tictactoe as ttt
+        path = bookFile(ttt.ROWS, ttt.COLS, ttt.NUM_TO_WIN)
+    if sys.argv[1] == "build":
+        build(path)
+    else:
+        verify(path)
+
+
+if __name__ == "__main__":
+    main()
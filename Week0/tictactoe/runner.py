@@ -2,7 +2,15 @@ import pygame
 import sys
 import time
 
+import book
 import tictactoe as ttt
+from aiworker import AIWorker
+
+# Usage: python runner.py [rows cols numToWin], for example 5 5 4
+if len(sys.argv) not in (1, 4):
+    sys.exit("Usage: python runner.py [rows cols numToWin]")
+if len(sys.argv) == 4:
+    ttt.ROWS, ttt.COLS, ttt.NUM_TO_WIN = (int(arg) for arg in sys.argv[1:])
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,11 +23,27 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Fit the board's tiles between the title and the Play Again button
+tile_size = min(80, (height - 160) // ttt.ROWS, (width - 40) // ttt.COLS)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+
+# Play from the opening book, solving it first if this is the first run.
+# Larger boards are too large to solve, so the AI searches every move.
+if ttt.ROWS * ttt.COLS <= ttt.EXACT_CELLS and not ttt.loadBook():
+    book.OpeningBook.solve().save(book.bookFile(ttt.ROWS, ttt.COLS, ttt.NUM_TO_WIN))
+    ttt.loadBook()
+
+# Searches for the AI's moves in the background, so the window stays responsive
+worker = AIWorker()
+
+# Seconds the AI waits before playing, so its moves do not appear instantly
+AI_DELAY = 0.5
 
 user = None
 board = ttt.initial_state()
 ai_turn = False
+ai_ready_at = None
 
 while True:
 
@@ -67,13 +91,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (len(board[0]) / 2 * tile_size),
+                       height / 2 - (len(board) / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(len(board)):
             row = []
-            for j in range(3):
+            for j in range(len(board[i])):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -111,19 +134,22 @@ while True:
         # Check for AI move
         if user != player and not game_over:
             if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+                if time.time() >= ai_ready_at:
+                    move = worker.poll()
+                    if move is not None:
+                        board = ttt.result(board, move)
+                        ai_turn = False
             else:
+                worker.request(board)
+                ai_ready_at = time.time() + AI_DELAY
                 ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(len(board)):
+                for j in range(len(board[i])):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -139,6 +165,7 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    worker.cancel()
                     user = None
                     board = ttt.initial_state()
                     ai_turn = False
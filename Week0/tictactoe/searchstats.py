@@ -0,0 +1,44 @@
+"""
+Counters describing the work a Tic Tac Toe search did
+"""
+
+import json
+
+
+class SearchStats():
+    """
+    Work done by one minimax call: positions visited, searches cut
+    short (a winning value found early, or an alpha-beta cutoff),
+    positions answered from a transposition table, the deepest ply
+    reached below the root and the wall time in seconds. method is how
+    the move was chosen: "book", "exact" or "alphabeta", where
+    completedDepth is the last depth iterative deepening finished.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.transpositionHits = 0
+        self.maxDepth = 0
+        self.completedDepth = None
+        self.wallTime = 0.0
+
+    def toDict(self):
+        """ Returns the counters as a dictionary """
+        return {
+            "method": self.method,
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "transpositionHits": self.transpositionHits,
+            "maxDepth": self.maxDepth,
+            "completedDepth": self.completedDepth,
+            "wallTime": self.wallTime,
+        }
+
+    def toJson(self):
+        """ Returns the counters as a JSON object """
+        return json.dumps(self.toDict())
+
+    def __repr__(self):
+        return f"SearchStats({self.toDict()})"
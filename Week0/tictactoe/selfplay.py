@@ -0,0 +1,152 @@
+"""
+Headless self-play for the Tic Tac Toe AI, playing many games in a pool
+of worker processes and reporting move latency, search work and
+outcomes.
+
+Usage: python selfplay.py [games] [processes] [rows cols numToWin] [--json]
+
+Plays games (default 1000) of each matchup: the AI against itself, and
+the AI against a random player with each side taking X half the time.
+The opening book is left out so that every AI move is searched, and
+every game starts from an empty transposition table, so that results
+do not depend on which games a worker process happened to play before.
+With --json the results are printed as one JSON object.
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+DEFAULT_GAMES = 1000
+SEED = 50
+MATCHUPS = ["ai-ai", "ai-random"]
+PERCENTILES = [50, 90, 99]
+
+# SearchStats counters summarized per AI move
+COUNTERS = ["nodes", "cutoffs", "transpositionHits", "maxDepth"]
+
+
+def configureWorker(rows, cols, numToWin):
+    """ Pool initializer setting the board every game is played on """
+    ttt.ROWS = rows
+    ttt.COLS = cols
+    ttt.NUM_TO_WIN = numToWin
+
+
+def playGame(game):
+    """
+    Plays one game from a (matchup, number, seed) tuple. Returns
+    (matchup, outcome, moves) with the SearchStats of each AI move as
+    a dictionary. For "ai-random", the AI is X in even numbered games
+    and its outcome is "ai", "random" or "tie"; otherwise the outcome
+    is "X", "O" or "tie".
+    """
+    matchup, number, seed = game
+    generator = random.Random(seed)
+    aiPlayer = None
+    if matchup == "ai-random":
+        aiPlayer = ttt.X if number % 2 == 0 else ttt.O
+
+    moves = []
+    board = ttt.initial_state()
+    ttt.geometryOf(board).transpositions.clear()
+    while not ttt.terminal(board):
+        if aiPlayer is None or ttt.player(board) == aiPlayer:
+            action = ttt.minimax(board)
+            moves.append(ttt.lastStats.toDict())
+        else:
+            action = generator.choice(sorted(ttt.actions(board)))
+        board = ttt.result(board, action)
+
+    winner = ttt.winner(board)
+    if winner is None:
+        outcome = "tie"
+    elif aiPlayer is None:
+        outcome = winner
+    else:
+        outcome = "ai" if winner == aiPlayer else "random"
+    return matchup, outcome, moves
+
+
+def percentile(values, percent):
+    """ Returns the nearest rank percentile of sorted values """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+def selfPlay(games, processes=None, rows=3, cols=3, numToWin=3):
+    """
+    Plays games of every matchup in a process pool and returns a
+    dictionary of results for each matchup: outcome counts, AI move
+    latency percentiles in milliseconds and search work per move.
+    """
+    generator = random.Random(SEED)
+    specs = [(matchup, number, generator.getrandbits(32))
+             for matchup in MATCHUPS for number in range(games)]
+
+    collected = {matchup: {"outcomes": {}, "moves": []} for matchup in MATCHUPS}
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(specs) // (processes * 8))
+    with multiprocessing.Pool(processes, configureWorker, (rows, cols, numToWin)) as pool:
+        for matchup, outcome, moves in pool.imap_unordered(playGame, specs, chunksize):
+            results = collected[matchup]
+            results["outcomes"][outcome] = results["outcomes"].get(outcome, 0) + 1
+            results["moves"].extend(moves)
+
+    return {matchup: summarize(results) for matchup, results in collected.items()}
+
+
+def summarize(results):
+    """ Reduces one matchup's collected moves to percentiles and totals """
+    moves = results["moves"]
+    latencies = sorted(move["wallTime"] for move in moves)
+    summary = {
+        "games": sum(results["outcomes"].values()),
+        "outcomes": dict(sorted(results["outcomes"].items())),
+        "moves": len(moves),
+        "latencyMs": {},
+        "perMove": {},
+    }
+    if moves:
+        for percent in PERCENTILES:
+            summary["latencyMs"][f"p{percent}"] = percentile(latencies, percent) * 1000
+        summary["latencyMs"]["max"] = latencies[-1] * 1000
+        for counter in COUNTERS:
+            values = [move[counter] for move in moves]
+            summary["perMove"][counter] = {"mean": sum(values) / len(values), "max": max(values)}
+    return summary
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--json"]
+    if len(args) not in (0, 1, 2, 5):
+        sys.exit("Usage: python selfplay.py [games] [processes] [rows cols numToWin] [--json]")
+    games = int(args[0]) if len(args) > 0 else DEFAULT_GAMES
+    processes = int(args[1]) if len(args) > 1 else None
+    shape = tuple(int(arg) for arg in args[2:5]) if len(args) == 5 else (3, 3, 3)
+
+    start = time.perf_counter()
+    results = selfPlay(games, processes, *shape)
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Played {games} games of each matchup on {shape[0]}x{shape[1]}, "
+          f"{shape[2]} to win, in {time.perf_counter() - start:.1f}s")
+    for matchup, summary in results.items():
+        outcomes = ", ".join(f"{outcome} {count}" for outcome, count in summary["outcomes"].items())
+        latency = "  ".join(f"{name} {value:.3f}" for name, value in summary["latencyMs"].items())
+        print(f"{matchup:<10} {outcomes}")
+        print(f"{'':<10} {summary['moves']} AI moves, latency ms: {latency}")
+        for counter, values in summary["perMove"].items():
+            print(f"{'':<10} {counter} per move: mean {values['mean']:.1f}, max {values['max']}")
+
+
+if __name__ == "__main__":
+    main()
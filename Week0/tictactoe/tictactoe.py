@@ -2,24 +2,57 @@
 Tic Tac Toe Player
 """
 
-import math
 import copy
+import json
+import math
+import os
+import time
+
+import alphabeta
+import bitboard
+import book
+from searchstats import SearchStats
 
 X = "X"
 O = "O"
 EMPTY = None
+ROWS = 3
+COLS = 3
 NUM_TO_WIN = 3
 MIN = -1
 MAX = 1
 
+# Boards with at most this many cells are solved exactly by minimax,
+# larger ones are searched by alphabeta within its time budget
+EXACT_CELLS = 9
+
+# Whether to play on the bitboard backend in bitboard.py, with the
+# functions below converting boards to and from it
+USE_BITBOARD = True
+
+# Where the transposition table is persisted between runs
+TRANSPOSITIONS_FILE = "transpositions.json"
+
+# Maps canonicalKey of each 3x3 position searched to its minimax value.
+# Other board shapes keep their own table on their bitboard.Geometry.
+transpositions = bitboard.geometry(3, 3, 3).transpositions
+
+# SearchStats of the last minimax call
+lastStats = SearchStats()
+
+# SearchStats the search in progress counts its work in
+currentStats = lastStats
+
+# book.OpeningBook that minimax plays from instead of searching, when
+# it covers the board
+openingBook = None
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * COLS for _ in range(ROWS)]
 
 
 def player(board):
@@ -27,6 +60,10 @@ def player(board):
     Returns player who has the next turn on a board. 
     X-player always moves first.
     """
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        return X if shape.xToMove(*shape.fromBoard(board)) else O
+
     xCount = 0 # Appearances of X on the board
     oCount = 0 # Apprearances of O on the board
 
@@ -44,6 +81,10 @@ def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        return {divmod(cell, shape.cols) for cell in shape.emptyCells(*shape.fromBoard(board))}
+
     actions = set()
 
     for row in range(len(board)):
@@ -62,6 +103,15 @@ def result(board, action):
     if board[row][col] != EMPTY:
         raise Exception
 
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        x, o = shape.fromBoard(board)
+        if shape.xToMove(x, o):
+            x |= shape.bits[row * shape.cols + col]
+        else:
+            o |= shape.bits[row * shape.cols + col]
+        return shape.toBoard(x, o)
+
     playerTurn = player(board)
     boardCopy = copy.deepcopy(board)
     boardCopy[row][col] = playerTurn
@@ -72,6 +122,9 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        return shape.winner(*shape.fromBoard(board))
 
     winInRow = checkWinInRow(board)
     if winInRow != None:
@@ -89,66 +142,72 @@ def winner(board):
 
 def checkWinInRow(board):
     """
-    Determine if a player has won on the current board from any of
-    the three rows
+    Determine if a player has won on the current board with
+    NUM_TO_WIN in a row along any of the rows
     """
     for row in range(len(board)):
-        currPlayer = board[row][0];
-        count = 0
-        if currPlayer == EMPTY:
-            continue
-        for col in range(len(board[row])):
-            if board[row][col] == currPlayer:
-                count+=1
-        
-        if count == NUM_TO_WIN:
-            return currPlayer
+        winPlayer = checkWinInLine([board[row][col] for col in range(len(board[row]))])
+        if winPlayer != None:
+            return winPlayer
     return None
             
 def checkWinInCol(board):
     """
-    Determine if a player has won on the current board from any of 
-    the three columns
+    Determine if a player has won on the current board with
+    NUM_TO_WIN in a row down any of the columns
     """
     for col in range(len(board[0])):
-        currPlayer = board[0][col];
-        count = 0
-        if currPlayer == EMPTY:
-            continue
-        for row in range(len(board)):
-            if board[row][col] == currPlayer:
-                count+=1
-
-        if count == NUM_TO_WIN:
-            return currPlayer
+        winPlayer = checkWinInLine([board[row][col] for row in range(len(board))])
+        if winPlayer != None:
+            return winPlayer
     return None
 
 def checkWinInDiag(board):
     """
-    Determine if a player has won on the current board from either
-    of the two diagonals
+    Determine if a player has won on the current board with
+    NUM_TO_WIN in a row along any diagonal, in either direction
     """
-    # Check middle point
-    middlePlayer = board[1][1]
-    if middlePlayer == EMPTY:
-        return None
-    
-    # Check left to right diagonal
-    if board[0][0] == middlePlayer:
-        if board[2][2] == middlePlayer:
-            return middlePlayer
-    
-    # Check right to left diagonal
-    if board[2][0] == middlePlayer:
-        if board[0][2] == middlePlayer:
-            return middlePlayer
-    
+    rows = len(board)
+    cols = len(board[0])
+    for start in range(-(rows - 1), cols):
+        # Left to right diagonals, where col - row == start
+        line = [board[row][row + start] for row in range(rows) if 0 <= row + start < cols]
+        winPlayer = checkWinInLine(line)
+        if winPlayer != None:
+            return winPlayer
+
+        # Right to left diagonals, where col + row == start + rows - 1
+        total = start + rows - 1
+        line = [board[row][total - row] for row in range(rows) if 0 <= total - row < cols]
+        winPlayer = checkWinInLine(line)
+        if winPlayer != None:
+            return winPlayer
+    return None
+
+def checkWinInLine(line):
+    """
+    Returns the player holding NUM_TO_WIN consecutive cells of line,
+    if there is one
+    """
+    currPlayer = EMPTY
+    count = 0
+    for cell in line:
+        if cell == currPlayer:
+            count+=1
+        else:
+            currPlayer = cell
+            count = 1
+        if currPlayer != EMPTY and count == NUM_TO_WIN:
+            return currPlayer
     return None
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        return bool(shape.terminal(*shape.fromBoard(board)))
     if winner(board) != None or len(actions(board)) == 0:
         return True
     else: 
@@ -159,6 +218,10 @@ def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
+    if USE_BITBOARD:
+        shape = geometryOf(board)
+        return shape.utility(*shape.fromBoard(board))
+
     winPlayer = winner(board)
 
     if winPlayer == X:
@@ -169,10 +232,44 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, cancel=None, stats=None):
     """
     Returns the optimal action for the current player on the board.
+
+    Boards with more than EXACT_CELLS cells are too large to solve, and
+    get the best action alphabeta finds within its time budget instead.
+    Setting the cancel threading.Event cuts that search short.
+
+    The work done is counted in stats, if given, and in lastStats.
     """
+    global lastStats, currentStats
+    lastStats = currentStats = stats if stats is not None else SearchStats()
+    start = time.perf_counter()
+    action = chooseAction(board, cancel)
+    lastStats.wallTime = time.perf_counter() - start
+    return action
+
+
+def chooseAction(board, cancel):
+    """ Picks minimax's action, recording in currentStats how it was chosen """
+    if openingBook is not None and openingBook.covers(board, NUM_TO_WIN):
+        entry = openingBook.lookup(board)
+        if entry is not None:
+            currentStats.method = "book"
+            return entry[1]
+
+    shape = geometryOf(board)
+    if shape.cells > EXACT_CELLS:
+        currentStats.method = "alphabeta"
+        cell = alphabeta.bestCell(shape, *shape.fromBoard(board), cancel=cancel,
+                                  stats=currentStats)
+        return None if cell is None else divmod(cell, shape.cols)
+
+    currentStats.method = "exact"
+    if USE_BITBOARD:
+        cell = bestCell(shape, *shape.fromBoard(board))
+        return None if cell is None else divmod(cell, shape.cols)
+
     if terminal(board):
         # Game is finished
         return None 
@@ -201,36 +298,189 @@ def minimax(board):
         return minMove
 
 
-def maxValue(board):
+def maxValue(board, ply=1):
     """ 
     Recursively calls the minValue function until the max is found
     or all actions have been exhausted. Returns the maximum/optimal
     outcome found from remaining actions.
     """
+    stats = currentStats
+    stats.nodes += 1
+    if ply > stats.maxDepth:
+        stats.maxDepth = ply
+    table = geometryOf(board).transpositions
+    key = canonicalKey(board)
+    if key in table:
+        stats.transpositionHits += 1
+        return table[key]
+
     maxValue = -math.inf
     if terminal(board):
-        return utility(board)
-    for action in actions(board):
-        maxValue = max(maxValue, minValue(result(board, action)))
-        if maxValue == MAX:
-            # Stops the search short because the max has already
-            # been found
-            return maxValue
+        maxValue = utility(board)
+    else:
+        for action in actions(board):
+            maxValue = max(maxValue, minValue(result(board, action), ply + 1))
+            if maxValue == MAX:
+                # Stops the search short because the max has already
+                # been found
+                stats.cutoffs += 1
+                break
+    table[key] = maxValue
     return maxValue
 
-def minValue(board):
+def minValue(board, ply=1):
     """ 
     Recursively calls the maxValue function until the min is found
     or all actions have been exhausted. Returns the minimum/optimal
     outcome found from remaining actions.
     """
+    stats = currentStats
+    stats.nodes += 1
+    if ply > stats.maxDepth:
+        stats.maxDepth = ply
+    table = geometryOf(board).transpositions
+    key = canonicalKey(board)
+    if key in table:
+        stats.transpositionHits += 1
+        return table[key]
+
     minValue = math.inf
     if terminal(board):
-        return utility(board)
-    for action in actions(board):
-        minValue = min(minValue, maxValue(result(board,action)))
-        if minValue == MIN:
-            # Stops the search short because the min has already
-            # been found
-            return minValue
-    return minValue
\ No newline at end of file
+        minValue = utility(board)
+    else:
+        for action in actions(board):
+            minValue = min(minValue, maxValue(result(board,action), ply + 1))
+            if minValue == MIN:
+                # Stops the search short because the min has already
+                # been found
+                stats.cutoffs += 1
+                break
+    table[key] = minValue
+    return minValue
+
+
+def bestCell(shape, x, o):
+    """
+    Bitboard counterpart of minimax, returning the optimal cell for
+    the current player or None if the game is over.
+    """
+    if shape.terminal(x, o):
+        return None
+
+    best = None
+    if shape.xToMove(x, o):
+        maxMoveValue = -math.inf
+        for cell in shape.emptyCells(x, o):
+            utility = minValueBits(shape, x | shape.bits[cell], o)
+            if utility > maxMoveValue:
+                maxMoveValue = utility
+                best = cell
+    else:
+        minMoveValue = math.inf
+        for cell in shape.emptyCells(x, o):
+            utility = maxValueBits(shape, x, o | shape.bits[cell])
+            if utility < minMoveValue:
+                minMoveValue = utility
+                best = cell
+    return best
+
+
+def maxValueBits(shape, x, o, ply=1):
+    """ Bitboard counterpart of maxValue, with X to move """
+    stats = currentStats
+    stats.nodes += 1
+    if ply > stats.maxDepth:
+        stats.maxDepth = ply
+    key = shape.canonicalKey(x, o)
+    if key in shape.transpositions:
+        stats.transpositionHits += 1
+        return shape.transpositions[key]
+
+    if shape.terminal(x, o):
+        maxValue = shape.utility(x, o)
+    else:
+        maxValue = -math.inf
+        for cell in shape.emptyCells(x, o):
+            maxValue = max(maxValue, minValueBits(shape, x | shape.bits[cell], o, ply + 1))
+            if maxValue == MAX:
+                stats.cutoffs += 1
+                break
+    shape.transpositions[key] = maxValue
+    return maxValue
+
+
+def minValueBits(shape, x, o, ply=1):
+    """ Bitboard counterpart of minValue, with O to move """
+    stats = currentStats
+    stats.nodes += 1
+    if ply > stats.maxDepth:
+        stats.maxDepth = ply
+    key = shape.canonicalKey(x, o)
+    if key in shape.transpositions:
+        stats.transpositionHits += 1
+        return shape.transpositions[key]
+
+    if shape.terminal(x, o):
+        minValue = shape.utility(x, o)
+    else:
+        minValue = math.inf
+        for cell in shape.emptyCells(x, o):
+            minValue = min(minValue, maxValueBits(shape, x, o | shape.bits[cell], ply + 1))
+            if minValue == MIN:
+                stats.cutoffs += 1
+                break
+    shape.transpositions[key] = minValue
+    return minValue
+
+
+def canonicalKey(board):
+    """
+    Returns an integer encoding of the board that is the same for all
+    of its rotations and reflections, which share one minimax value.
+    """
+    shape = geometryOf(board)
+    return shape.canonicalKey(*shape.fromBoard(board))
+
+
+def geometryOf(board):
+    """ Returns the bitboard.Geometry for the board's shape and NUM_TO_WIN """
+    return bitboard.geometry(len(board), len(board[0]), NUM_TO_WIN)
+
+
+def loadTranspositions(path=TRANSPOSITIONS_FILE):
+    """ Adds the positions saved by saveTranspositions, if path exists """
+    if os.path.exists(path):
+        with open(path) as f:
+            transpositions.update((int(key), value) for key, value in json.load(f).items())
+
+
+def saveTranspositions(path=TRANSPOSITIONS_FILE):
+    """ Writes every position searched so far to path """
+    with open(path, "w") as f:
+        json.dump(transpositions, f, separators=(",", ":"), sort_keys=True)
+
+
+def loadBook(path=None):
+    """
+    Loads the opening book written by book.py for minimax to play from,
+    by default the book for ROWS, COLS and NUM_TO_WIN. Returns False if
+    there is no book at path.
+    """
+    global openingBook
+    if path is None:
+        path = book.bookFile(ROWS, COLS, NUM_TO_WIN)
+    if not os.path.exists(path):
+        return False
+    openingBook = book.OpeningBook.load(path)
+    return True
+
+
+def main():
+    # Solving from the empty board fills in every reachable position
+    minimax(initial_state())
+    saveTranspositions()
+    print(f"Saved {len(transpositions)} positions to {TRANSPOSITIONS_FILE}.")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,12 +1,39 @@
 import itertools
+import math
+import multiprocessing
+import os
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from sat import Solver
+
+# Symbols model_check enumerates together as one batch of 2 ** BATCH_SYMBOLS models
+BATCH_SYMBOLS = 16
+
+# Batch models as numpy boolean arrays rather than the bits of ints, if
+# numpy is installed. Ints pack eight models a byte and check faster.
+USE_NUMPY = False
 
 
 class Sentence():
+    __slots__ = ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        out. Returns True or False if every way of completing the model
+        gives that value, otherwise None.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -15,6 +42,24 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def compile(self, index):
+        """
+        Returns a function evaluating the logical sentence in a model
+        given as a sequence of values, where index maps each symbol
+        name to its position in the sequence.
+        """
+        raise Exception("nothing to compile")
+
+    def compile_columns(self, index):
+        """
+        Returns a function of (columns, full) evaluating the logical
+        sentence in a whole batch of models at once. columns holds a
+        column per symbol position in index, with the symbol's value in
+        every model of the batch, and full is the column true in every
+        model. Columns are the bits of an int or numpy boolean arrays.
+        """
+        raise Exception("nothing to compile")
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,6 +88,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -62,14 +108,28 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
         return {self.name}
 
+    def compile(self, index):
+        position = index[self.name]
+        return lambda values: values[position]
+
+    def compile_columns(self, index):
+        position = index[self.name]
+        return lambda columns, full: columns[position]
+
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
@@ -86,21 +146,36 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
         return self.operand.symbols()
 
+    def compile(self, index):
+        operand = self.operand.compile(index)
+        return lambda values: not operand(values)
+
+    def compile_columns(self, index):
+        operand = self.operand.compile_columns(index)
+        return lambda columns, full: full ^ operand(columns, full)
+
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return (isinstance(other, And)
+                and tuple(self.conjuncts) == tuple(other.conjuncts))
 
     def __hash__(self):
         return hash(
@@ -120,6 +195,16 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,17 +212,43 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
+
+    def compile(self, index):
+        conjuncts = [conjunct.compile(index) for conjunct in self.conjuncts]
+        if len(conjuncts) == 2:
+            first, second = conjuncts
+            return lambda values: first(values) and second(values)
+
+        def evaluate(values):
+            for conjunct in conjuncts:
+                if not conjunct(values):
+                    return False
+            return True
+        return evaluate
+
+    def compile_columns(self, index):
+        conjuncts = [conjunct.compile_columns(index) for conjunct in self.conjuncts]
+
+        def evaluate(columns, full):
+            result = full
+            for conjunct in conjuncts:
+                result = result & conjunct(columns, full)
+            return result
+        return evaluate
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return (isinstance(other, Or)
+                and tuple(self.disjuncts) == tuple(other.disjuncts))
 
     def __hash__(self):
         return hash(
@@ -151,6 +262,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,10 +279,35 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
+
+    def compile(self, index):
+        disjuncts = [disjunct.compile(index) for disjunct in self.disjuncts]
+        if len(disjuncts) == 2:
+            first, second = disjuncts
+            return lambda values: first(values) or second(values)
+
+        def evaluate(values):
+            for disjunct in disjuncts:
+                if disjunct(values):
+                    return True
+            return False
+        return evaluate
+
+    def compile_columns(self, index):
+        disjuncts = [disjunct.compile_columns(index) for disjunct in self.disjuncts]
+
+        def evaluate(columns, full):
+            result = full ^ full
+            for disjunct in disjuncts:
+                result = result | disjunct(columns, full)
+            return result
+        return evaluate
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -183,16 +329,41 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return set().union(self.antecedent.symbols(), self.consequent.symbols())
+
+    def compile(self, index):
+        antecedent = self.antecedent.compile(index)
+        consequent = self.consequent.compile(index)
+        return lambda values: not antecedent(values) or consequent(values)
+
+    def compile_columns(self, index):
+        antecedent = self.antecedent.compile_columns(index)
+        consequent = self.consequent.compile_columns(index)
+        return lambda columns, full: (
+            (full ^ antecedent(columns, full)) | consequent(columns, full)
+        )
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -211,10 +382,16 @@ class Biconditional(Sentence):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
+
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
@@ -222,42 +399,544 @@ class Biconditional(Sentence):
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return set().union(self.left.symbols(), self.right.symbols())
+
+    def compile(self, index):
+        left = self.left.compile(index)
+        right = self.right.compile(index)
+        return lambda values: left(values) == right(values)
+
+    def compile_columns(self, index):
+        left = self.left.compile_columns(index)
+        right = self.right.compile_columns(index)
+        return lambda columns, full: full ^ left(columns, full) ^ right(columns, full)
+
+
+class Interned():
+    """
+    Mixin making a sentence class hash-consed: structurally equal
+    interned sentences are one shared node, built once, whose hash and
+    symbols are computed from its parts when it is made. Interned
+    sentences are immutable and can be mixed freely with the plain
+    classes, which they compare equal to.
+    """
+    __slots__ = ()
+
+    # Maps (class, parts) to the live node with those parts
+    table = weakref.WeakValueDictionary()
+
+    def __new__(cls, *parts):
+        parts = tuple(intern(part) if isinstance(part, Sentence) else part
+                      for part in parts)
+        key = (cls, parts)
+        node = Interned.table.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            super(Interned, node).__init__(*parts)
+            node.parts = parts
+            node.freeze()
+            node.cached_symbols = frozenset(super(Interned, node).symbols())
+            node.cached_hash = super(Interned, node).__hash__()
+            Interned.table[key] = node
+        return node
+
+    def __init__(self, *parts):
+        pass
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "cached_hash"):
+            raise AttributeError("interned sentences are immutable")
+        object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Interned) and self.cached_hash != other.cached_hash:
+            return False
+        return super().__eq__(other)
 
+    def __hash__(self):
+        return self.cached_hash
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def __reduce__(self):
+        return (type(self), self.parts)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    def freeze(self):
+        """Replaces mutable parts of the node with immutable ones."""
+        pass
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    def symbols(self):
+        return self.cached_symbols
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+class InternedSymbol(Interned, Symbol):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+class InternedNot(Interned, Not):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+class InternedAnd(Interned, And):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
+
+    def freeze(self):
+        object.__setattr__(self, "conjuncts", self.parts)
+
+    def add(self, conjunct):
+        raise TypeError("interned sentences are immutable")
+
+
+class InternedOr(Interned, Or):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
+
+    def freeze(self):
+        object.__setattr__(self, "disjuncts", self.parts)
+
+
+class InternedImplication(Interned, Implication):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
+
+
+class InternedBiconditional(Interned, Biconditional):
+    __slots__ = ("parts", "cached_symbols", "cached_hash", "__weakref__")
+
+
+def intern(sentence):
+    """
+    Returns the interned sentence structurally equal to sentence,
+    sharing every subsentence with the interned sentences already made.
+    """
+    if isinstance(sentence, Interned):
+        return sentence
+    if isinstance(sentence, Symbol):
+        return InternedSymbol(sentence.name)
+    if isinstance(sentence, Not):
+        return InternedNot(sentence.operand)
+    if isinstance(sentence, And):
+        return InternedAnd(*sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return InternedOr(*sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return InternedImplication(sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, Biconditional):
+        return InternedBiconditional(sentence.left, sentence.right)
+    raise TypeError(f"cannot intern {sentence!r}")
+
+
+def truth_columns(count):
+    """
+    Returns (columns, full) for the batch of all 2 ** count models of
+    count symbols, in the form compile_columns functions take: model m
+    gives symbol i the value of bit i of m. Columns are numpy boolean
+    arrays under USE_NUMPY, otherwise the bits of an int.
+    """
+    if USE_NUMPY and numpy is not None:
+        models = numpy.arange(2 ** count)
+        columns = [(models >> i & 1).astype(bool) for i in range(count)]
+        return columns, numpy.ones(2 ** count, dtype=bool)
+
+    full = (1 << 2 ** count) - 1
+    columns = []
+    for i in range(count):
+        # 2 ** i false models then 2 ** i true ones, repeated
+        period = 2 ** (i + 1)
+        pattern = ((1 << 2 ** i) - 1) << 2 ** i
+        columns.append(pattern * (full // ((1 << period) - 1)))
+    return columns, full
+
+
+def any_model(column):
+    """Checks if a column is true in any model of its batch."""
+    if isinstance(column, int):
+        return column != 0
+    return bool(column.any())
+
+
+def ordered_symbols(sentence):
+    """
+    Returns the symbols in sentence in the order they first appear, so
+    that symbols mentioned together are assigned close together.
+    """
+    order = dict()
+    pending = [sentence]
+    while pending:
+        sentence = pending.pop()
+        if isinstance(sentence, Symbol):
+            order.setdefault(sentence.name)
+        elif isinstance(sentence, Not):
+            pending.append(sentence.operand)
+        elif isinstance(sentence, And):
+            pending.extend(reversed(sentence.conjuncts))
+        elif isinstance(sentence, Or):
+            pending.extend(reversed(sentence.disjuncts))
+        elif isinstance(sentence, Implication):
+            pending.extend((sentence.consequent, sentence.antecedent))
+        elif isinstance(sentence, Biconditional):
+            pending.extend((sentence.right, sentence.left))
+    return list(order)
+
+
+def model_check(knowledge, query, cube=None):
+    """
+    Checks if knowledge base entails query. If cube is given, a dict
+    fixing the values of some symbols, only models agreeing with it are
+    checked.
+    """
+    cube = cube or dict()
+
+    # Get all symbols in both knowledge and query, in order of appearance
+    counterexample = And(knowledge, Not(query))
+    symbols = [symbol for symbol in ordered_symbols(counterexample) if symbol not in cube]
+
+    # The last symbols are checked as one batch of models, and the rest
+    # are assigned one at a time, after the symbols the cube fixes
+    batch = min(len(symbols), BATCH_SYMBOLS)
+    assigned = list(cube) + symbols[:len(symbols) - batch]
+    batched = symbols[len(symbols) - batch:]
+    columns, full = truth_columns(batch)
+    empty = full ^ full
+
+    # Compile the models where knowledge holds and query does not
+    index = {symbol: i for i, symbol in enumerate(batched + assigned)}
+    check = counterexample.compile_columns(index)
+
+    def check_all(model, values):
+        """Checks that no completion of model is a counterexample."""
+
+        # Stop early once the assignments so far settle the question
+        known = counterexample.evaluate_partial(model)
+        if known is not None:
+            return not known
+
+        # If every symbol outside the batch is assigned, check the batch
+        if len(values) == len(assigned):
+            return not any_model(check(columns + values, full))
+
+        # Ensure entailment holds with the next symbol true and false
+        p = assigned[len(values)]
+        for value, column in ((True, full), (False, empty)):
+            model[p] = value
+            holds = check_all(model, values + [column])
+            del model[p]
+            if not holds:
+                return False
+        return True
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(dict(cube), [full if cube[symbol] else empty for symbol in cube])
+
+
+# Cubes per process parallel_model_check splits the models into, at least
+CUBES_PER_PROCESS = 8
+
+# Knowledge and query checked by a parallel_model_check pool worker
+worker_problem = None
+
+
+def init_worker(knowledge, query):
+    """Pool initializer setting the problem every cube is checked for."""
+    global worker_problem
+    worker_problem = (knowledge, query)
+
+
+def check_cube(cube):
+    """Checks the worker's problem within one cube."""
+    knowledge, query = worker_problem
+    return model_check(knowledge, query, cube)
+
+
+def parallel_model_check(knowledge, query, processes=None, cube_symbols=None):
+    """
+    Checks if knowledge base entails query like model_check, splitting
+    the models into 2 ** cube_symbols cubes, one per assignment of the
+    first symbols, and checking the cubes in a pool of processes. Stops
+    every process as soon as any cube holds a counterexample.
+    """
+    processes = processes or os.cpu_count()
+    counterexample = And(knowledge, Not(query))
+    symbols = ordered_symbols(counterexample)
+    if cube_symbols is None:
+        cube_symbols = math.ceil(math.log2(processes * CUBES_PER_PROCESS))
+    cube_symbols = min(cube_symbols, len(symbols))
+
+    # Leave out cubes their own assignment already settles
+    cubes = []
+    for values in itertools.product((True, False), repeat=cube_symbols):
+        cube = dict(zip(symbols, values))
+        known = counterexample.evaluate_partial(cube)
+        if known is None:
+            cubes.append(cube)
+        elif known:
+            return False
+    if not cubes:
+        return True
+
+    with multiprocessing.Pool(processes, init_worker, (knowledge, query)) as pool:
+        for holds in pool.imap_unordered(check_cube, cubes):
+            if not holds:
+                return False
+    return True
+
+
+def models(knowledge, symbols=None):
+    """
+    Lazily yields every model in which knowledge is true, as a dict
+    over the symbols in knowledge and any other symbols given.
+    Assignments that already make knowledge false are never extended.
+    """
+    order = ordered_symbols(knowledge)
+    order += sorted(set(symbols or ()) - set(order))
+
+    def extend(model, known):
+        if known is None:
+            known = knowledge.evaluate_partial(model)
+        if known is False:
+            return
+        if len(model) == len(order):
+            yield dict(model)
+            return
+        p = order[len(model)]
+        for value in (True, False):
+            model[p] = value
+            yield from extend(model, known)
+            del model[p]
+
+    yield from extend(dict(), None)
+
+
+class CNF():
+    """
+    Tseitin encoding of sentences as clauses over integer variables,
+    in the clause format of sat.Solver. Every symbol gets a variable,
+    and every compound subsentence a variable defined equal to it, so
+    the clauses grow linearly with the sentences encoded.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.variables = dict()    # Maps symbol names to their variables
+        self.definitions = dict()  # Maps compound sentences to their variables
+        self.true = None           # Variable fixed true, for empty And and Or
+
+    def new_var(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable of the symbol called name."""
+        if name not in self.variables:
+            self.variables[name] = self.new_var()
+        return self.variables[name]
+
+    def literal(self, sentence, clauses):
+        """
+        Returns a literal equivalent to sentence, appending to clauses
+        any definitions it needs that were not made before.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand, clauses)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, (And, Or)):
+            parts = (sentence.conjuncts if isinstance(sentence, And)
+                     else sentence.disjuncts)
+            if not parts:
+                if self.true is None:
+                    self.true = self.new_var()
+                    clauses.append([self.true])
+                return self.true if isinstance(sentence, And) else -self.true
+            literals = [self.literal(part, clauses) for part in parts]
+            variable = self.new_var()
+
+            # An Or is the negation of the And of its negated disjuncts
+            sign = 1 if isinstance(sentence, And) else -1
+            for literal in literals:
+                clauses.append([-sign * variable, sign * literal])
+            clauses.append([sign * variable] + [-sign * literal for literal in literals])
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent, clauses)
+            consequent = self.literal(sentence.consequent, clauses)
+            variable = self.new_var()
+            clauses.append([-variable, -antecedent, consequent])
+            clauses.append([variable, antecedent])
+            clauses.append([variable, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left, clauses)
+            right = self.literal(sentence.right, clauses)
+            variable = self.new_var()
+            clauses.append([-variable, -left, right])
+            clauses.append([-variable, left, -right])
+            clauses.append([variable, left, right])
+            clauses.append([variable, -left, -right])
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+
+        self.definitions[sentence] = variable
+        return variable
+
+    def encode(self, sentence, guard=None):
+        """
+        Returns the clauses asserting sentence. Conjunctions and
+        disjunctions at the top are split into clauses directly rather
+        than through a defined variable. If guard is a variable, the
+        clauses only assert sentence while guard is true.
+        """
+        clauses = []
+        asserted = []
+        pending = [sentence]
+        while pending:
+            sentence = pending.pop()
+            if isinstance(sentence, And):
+                pending.extend(sentence.conjuncts)
+            elif isinstance(sentence, Not) and isinstance(sentence.operand, Or):
+                pending.extend(Not(disjunct) for disjunct in sentence.operand.disjuncts)
+            elif isinstance(sentence, Not) and isinstance(sentence.operand, Not):
+                pending.append(sentence.operand.operand)
+            elif isinstance(sentence, Or):
+                asserted.append([self.literal(disjunct, clauses)
+                                 for disjunct in sentence.disjuncts])
+            elif isinstance(sentence, Implication):
+                asserted.append([-self.literal(sentence.antecedent, clauses),
+                                 self.literal(sentence.consequent, clauses)])
+            else:
+                asserted.append([self.literal(sentence, clauses)])
+        if guard is not None:
+            asserted = [[-guard] + clause for clause in asserted]
+        return clauses + asserted
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, like model_check, by asking
+    a SAT solver whether knowledge and the negation of query can both
+    be true.
+    """
+    cnf = CNF()
+    solver = Solver()
+    for clause in cnf.encode(And(knowledge, Not(query))):
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+class KnowledgeBase():
+    """
+    Sentences told to one SAT solver, which keeps what it learns across
+    questions. Each told sentence's clauses are guarded by a selector
+    variable that every ask assumes true, so retracting a sentence just
+    stops assuming it. Models found along the way are kept, and answer
+    any later question they are a counterexample to without a solve.
+    """
+
+    def __init__(self, *sentences):
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.selectors = dict()  # Maps each told sentence to its selector
+        self.models = []         # Models of the knowledge found by solves
+        self.answers = dict()    # Maps queries to whether they are entailed
+        self.solves = 0
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        if sentence in self.selectors:
+            return
+        selector = self.cnf.new_var()
+        self.selectors[sentence] = selector
+        for clause in self.cnf.encode(sentence, guard=selector):
+            self.solver.add_clause(clause)
+
+        # Only entailments survive new knowledge, and only models of it
+        self.answers = {query: entailed for query, entailed in self.answers.items() if entailed}
+        self.models = [model for model in self.models if self.holds(sentence, model)]
+
+    def retract(self, sentence):
+        """Removes a sentence told before from the knowledge base."""
+        if sentence not in self.selectors:
+            raise Exception(f"{sentence} is not in the knowledge base")
+        selector = self.selectors.pop(sentence)
+        self.solver.add_clause([-selector])
+
+        # Counterexamples survive losing knowledge, entailments may not
+        self.answers = {query: entailed for query, entailed in self.answers.items() if not entailed}
+
+    def holds(self, sentence, model):
+        """
+        Checks if sentence is true in a model, or returns None if the
+        model does not cover its symbols.
+        """
+        if not sentence.symbols() <= model.keys():
+            return None
+        return sentence.evaluate(model)
+
+    def solve(self, assumptions=()):
+        """
+        Looks for a model of the knowledge in which assumptions hold,
+        keeping and returning it if there is one, or returns None.
+        """
+        self.solves += 1
+        assumptions = list(self.selectors.values()) + list(assumptions)
+        if not self.solver.solve(assumptions):
+            return None
+        model = {name: self.solver.model[variable]
+                 for name, variable in self.cnf.variables.items()}
+        self.models.append(model)
+        return model
+
+    def satisfiable(self):
+        """Checks if some model makes every sentence in the knowledge base true."""
+        return bool(self.models) or self.solve() is not None
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.ask_all([query])[query]
+
+    def ask_all(self, queries):
+        """
+        Returns a dict mapping each query to whether the knowledge base
+        entails it. Rather than a solve per query, each solve looks for
+        a model making any unanswered query false: every query false in
+        the model it finds is answered, and once there is none, all the
+        remaining queries are entailed.
+        """
+        answers = dict()
+        literals = dict()
+        for query in queries:
+            Sentence.validate(query)
+            if query in self.answers:
+                answers[query] = self.answers[query]
+            elif query not in literals:
+                clauses = []
+                literals[query] = self.cnf.literal(query, clauses)
+                for clause in clauses:
+                    self.solver.add_clause(clause)
+
+        pending = list(literals)
+        while pending:
+            # Queries false in a known model are not entailed
+            for query in pending:
+                if any(self.holds(query, model) is False for model in self.models):
+                    answers[query] = False
+            pending = [query for query in pending if query not in answers]
+            if not pending:
+                break
+
+            # Guard the clause that some pending query is false, and
+            # retire it after the solve
+            guard = self.cnf.new_var()
+            self.solver.add_clause([-guard] + [-literals[query] for query in pending])
+            model = self.solve([guard])
+            self.solver.add_clause([-guard])
+            if model is None:
+                for query in pending:
+                    answers[query] = True
+                break
+
+        self.answers.update(answers)
+        return answers
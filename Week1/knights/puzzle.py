@@ -80,8 +80,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            answers = KnowledgeBase(knowledge).ask_all(symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if answers[symbol]:
                     print(f"    {symbol}")
 
 
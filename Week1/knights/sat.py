@@ -0,0 +1,353 @@
+"""
+Conflict driven clause learning SAT solver.
+
+Clauses are lists of integer literals in the DIMACS convention: a
+variable is a positive integer v, the literal v says it is true and -v
+says it is false.
+"""
+
+import heapq
+
+# Conflicts before the first restart, scaled by the Luby sequence
+RESTART_BASE = 100
+
+# Factor variable activities grow by on every conflict
+ACTIVITY_DECAY = 1 / 0.95
+
+# Learned clauses kept before a restart trims them, growing by half each time
+LEARNED_LIMIT = 2000
+
+# Learned clauses this short are always kept
+KEEP_LENGTH = 3
+
+
+def luby(i):
+    """Returns the i-th term (from 0) of the Luby sequence 1 1 2 1 1 2 4 ..."""
+    size = 1
+    power = 1
+    while size < i + 1:
+        size = 2 * size + 1
+        power *= 2
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power //= 2
+        i = i % size
+    return power
+
+
+class Solver():
+    """
+    CDCL solver with two watched literals per clause, first UIP clause
+    learning, activity based branching with saved phases and Luby
+    restarts. Clauses can be added between calls to solve, and clauses
+    learned in one call are kept for the next.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []  # Given clauses of two or more literals
+        self.learned = []  # Learned clauses of two or more literals, oldest first
+        self.learned_limit = LEARNED_LIMIT
+        self.watches = {}  # Maps a literal to the clauses watching it
+        self.inconsistent = False  # True once the clauses alone are unsatisfiable
+
+        # Per variable state, indexed by variable (index 0 unused)
+        self.assigns = [0]    # 1 if true, -1 if false, 0 if unassigned
+        self.levels = [0]     # Decision level each variable was assigned at
+        self.reasons = [None] # Clause that implied each variable, None if decided
+        self.activity = [0.0]
+        self.phases = [-1]    # Value each variable last had, tried first
+
+        self.trail = []       # Assigned literals in assignment order
+        self.trail_limits = []  # Trail length at the start of each decision level
+        self.head = 0         # Trail position unit propagation has reached
+        self.order = []       # Heap of (-activity, variable) for branching
+        self.bump = 1.0
+
+        self.model = None     # Maps variables to values after a satisfiable solve
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    def new_var(self):
+        """Adds a variable and returns it."""
+        self.ensure_vars(self.num_vars + 1)
+        return self.num_vars
+
+    def ensure_vars(self, count):
+        """Makes sure variables 1 to count exist."""
+        while self.num_vars < count:
+            self.num_vars += 1
+            self.assigns.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(-1)
+            heapq.heappush(self.order, (0.0, self.num_vars))
+
+    def value(self, literal):
+        """Returns 1 if literal is true, -1 if it is false, 0 if unassigned."""
+        if literal > 0:
+            return self.assigns[literal]
+        return -self.assigns[-literal]
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable, True otherwise.
+        """
+        if self.inconsistent:
+            return False
+        self.cancel_until(0)
+
+        literals = list(literals)
+        self.ensure_vars(max((abs(literal) for literal in literals), default=0))
+        clause = []
+        for literal in literals:
+            if -literal in clause:
+                return True  # Always true
+            if literal not in clause:
+                clause.append(literal)
+
+        # Drop literals already false, and the clause if already true
+        clause = [literal for literal in clause if self.value(literal) != -1]
+        if any(self.value(literal) == 1 for literal in clause):
+            return True
+
+        if not clause:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.clauses.append(clause)
+            self.attach(clause)
+        return not self.inconsistent
+
+    def attach(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def enqueue(self, literal, reason):
+        """Assigns literal true at the current decision level."""
+        variable = abs(literal)
+        self.assigns[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns a clause
+        whose literals are all false, or None if there is no conflict.
+        """
+        assigns = self.assigns
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(false_literal)
+            if not watchers:
+                continue
+
+            # Keep clauses that still watch false_literal in watchers[:kept]
+            kept = 0
+            i = 0
+            count = len(watchers)
+            while i < count:
+                clause = watchers[i]
+                i += 1
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                first_value = assigns[first] if first > 0 else -assigns[-first]
+                if first_value == 1:
+                    watchers[kept] = clause
+                    kept += 1
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if (assigns[literal] if literal > 0 else -assigns[-literal]) != -1:
+                        clause[1], clause[k] = literal, false_literal
+                        self.watches.setdefault(literal, []).append(clause)
+                        break
+                else:
+                    watchers[kept] = clause
+                    kept += 1
+                    if first_value == -1:
+                        # Every literal is false: keep the rest and report it
+                        while i < count:
+                            watchers[kept] = watchers[i]
+                            kept += 1
+                            i += 1
+                        del watchers[kept:]
+                        return clause
+                    self.enqueue(first, clause)
+                    self.propagations += 1
+            del watchers[kept:]
+        return None
+
+    def analyze(self, conflict):
+        """
+        Resolves the conflicting clause back to its first unique
+        implication point. Returns (learned clause, level to jump back
+        to), with the clause's asserting literal first.
+        """
+        learned = [0]
+        seen = set()
+        pending = 0  # Seen literals of the current level not yet resolved
+        level = len(self.trail_limits)
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump_activity(variable)
+                    if self.levels[variable] >= level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve on the most recently assigned seen literal
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal of the highest remaining level second
+        highest = max(range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump_activity(self, variable):
+        self.activity[variable] += self.bump
+        if self.activity[variable] > 1e100:
+            # Rescale every activity to keep them in floating point range
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.bump *= 1e-100
+            self.order = [(-self.activity[variable], variable)
+                          for variable in range(1, self.num_vars + 1)
+                          if self.assigns[variable] == 0]
+            heapq.heapify(self.order)
+        elif self.assigns[variable] == 0:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def cancel_until(self, level):
+        """Undoes every assignment made above decision level."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.assigns[variable]
+            self.assigns[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def reduce_learned(self):
+        """
+        Forgets the older half of the long learned clauses. Only called
+        at decision level 0, where no clause is needed as a reason.
+        """
+        old = len(self.learned) // 2
+        self.learned = ([clause for clause in self.learned[:old] if len(clause) <= KEEP_LENGTH]
+                        + self.learned[old:])
+        self.learned_limit += self.learned_limit // 2
+        self.watches = {}
+        for clause in self.clauses + self.learned:
+            self.attach(clause)
+
+    def pick_branch(self):
+        """Returns the unassigned variable with the highest activity, or None."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if self.assigns[variable] == 0:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Searches for an assignment satisfying every clause in which
+        every literal in assumptions is true. Returns True and fills in
+        model if there is one, otherwise returns False.
+        """
+        self.model = None
+        if self.inconsistent:
+            return False
+        for literal in assumptions:
+            self.ensure_vars(abs(literal))
+        self.cancel_until(0)
+        if self.propagate() is not None:
+            self.inconsistent = True
+            return False
+
+        restarts = 0
+        budget = RESTART_BASE * luby(0)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_limits:
+                    self.inconsistent = True
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.attach(learned)
+                    self.enqueue(learned[0], learned)
+                self.bump *= ACTIVITY_DECAY
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.cancel_until(0)
+                if len(self.learned) > self.learned_limit:
+                    self.reduce_learned()
+                continue
+
+            # Assume the next assumption, or else branch on a variable
+            literal = None
+            while len(self.trail_limits) < len(assumptions):
+                assumption = assumptions[len(self.trail_limits)]
+                value = self.value(assumption)
+                if value == -1:
+                    self.cancel_until(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    literal = assumption
+                    break
+            if literal is None:
+                variable = self.pick_branch()
+                if variable is None:
+                    self.model = {variable: self.assigns[variable] == 1
+                                  for variable in range(1, self.num_vars + 1)}
+                    self.cancel_until(0)
+                    return True
+                literal = variable if self.phases[variable] == 1 else -variable
+                self.trail_limits.append(len(self.trail))
+            self.decisions += 1
+            self.enqueue(literal, None)